@@ -0,0 +1,116 @@
+"""
+Compare the load time of a processed dataset stored as CSV and as Parquet.
+
+The CSV path is the one Model used originally: pd.read_csv with the python engine followed by
+parsing the stringified hashtags. The Parquet path reads only Model.COLUMNS with typed columns
+and native hashtag lists.
+
+Usage (from the repository root):
+    python -m benchmarks.load_formats --sizes 20000 200000 1200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.columnar_io import hashtag_texts, read_parquet, write_parquet
+from src.model import Model
+
+
+WORDS = "war peace ukraine russia support army people city news stand with kyiv nato".split()
+TAGS = ["Ukraine", "Russia", "StandWithUkraine", "Putin", "Kyiv", "NATO"]
+COUNTRIES = [("USA", "United States"), ("FRA", "France"), ("GBR", "United Kingdom"), (None, None)]
+
+
+def synthetic_processed_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a DataFrame shaped like the output of DataPreProcessor.
+
+    Args:
+        rows (int): Number of tweets to generate.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        pd.DataFrame: The synthetic processed tweets, with hashtags stored as in the raw export.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(5, 25, rows)
+    words = rng.choice(WORDS, lengths.sum())
+    bounds = np.cumsum(lengths)
+    texts = [" ".join(chunk) for chunk in np.split(words, bounds[:-1])]
+    hashtags = [
+        str([{"text": str(tag), "indices": [0, len(tag)]} for tag in rng.choice(TAGS, n)])
+        for n in rng.integers(0, 4, rows)
+    ]
+    country = rng.integers(0, len(COUNTRIES), rows)
+    return pd.DataFrame(
+        {
+            "username": ["user{}".format(i) for i in rng.integers(0, rows // 10 + 1, rows)],
+            "acctdesc": "account description",
+            "location": [COUNTRIES[i][1] or "nan" for i in country],
+            "followers": rng.integers(0, 100000, rows),
+            "usercreatedts": "2020-01-01 00:00:00",
+            "tweetcreatedts": "2022-04-02 00:00:00",
+            "retweetcount": rng.integers(0, 5000, rows),
+            "text": texts,
+            "hashtags": hashtags,
+            "language": "en",
+            "favorite_count": rng.integers(0, 5000, rows),
+            "tweet": texts,
+            "country": [COUNTRIES[i][1] for i in country],
+            "ISO": [COUNTRIES[i][0] for i in country],
+            "conflict_position": rng.integers(0, 3, rows),
+        }
+    )
+
+
+def load_csv(path: str) -> pd.DataFrame:
+    data = pd.read_csv(path, engine="python")
+    data["text"] = data["text"].astype(str)
+    data["hashtags"] = data["hashtags"].apply(hashtag_texts)
+    return data
+
+
+def load_parquet(path: str) -> pd.DataFrame:
+    data = read_parquet(path, Model.COLUMNS)
+    data["text"] = data["text"].astype(str)
+    return data
+
+
+def timed(function, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 200000, 1200000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{:>10} {:>10} {:>12} {:>12} {:>9}".format("rows", "format", "size (MB)", "load (s)", "speedup"))
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            data = synthetic_processed_data(rows)
+            csv_path = os.path.join(directory, "{}.csv".format(rows))
+            parquet_path = os.path.join(directory, "{}.parquet".format(rows))
+            data.to_csv(csv_path)
+            write_parquet(data, parquet_path)
+
+            csv_time = timed(load_csv, csv_path, repeat=args.repeat)
+            parquet_time = timed(load_parquet, parquet_path, repeat=args.repeat)
+            for name, path, seconds in (("csv", csv_path, csv_time), ("parquet", parquet_path, parquet_time)):
+                print(
+                    "{:>10} {:>10} {:>12.1f} {:>12.3f} {:>8.1f}x".format(
+                        rows, name, os.path.getsize(path) / 1e6, seconds, csv_time / seconds
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
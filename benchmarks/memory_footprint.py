@@ -0,0 +1,53 @@
+"""
+Compare the resident memory of a Model with the declared dtype schema against the inferred dtypes.
+
+The baseline is the frame Model used to keep: every CSV column with the dtypes pandas infers,
+float64 polarity and the derived columns. Sizes are deep sizes, as reported by Model.memory_report.
+The number of distinct values of each column shows which ones are worth a categorical.
+
+Usage (from the repository root):
+    python -m benchmarks.memory_footprint --rows 200000
+    python -m benchmarks.memory_footprint --dataset data/tweets_processed/0402_UkraineCombinedTweetsDeduped_PROCESSED.csv
+"""
+import argparse
+import os
+import tempfile
+import pandas as pd
+from benchmarks.load_formats import synthetic_processed_data
+from src.model import Model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dataset", help="a processed CSV file to measure instead of synthetic data")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.dataset or os.path.join(directory, "tweets.csv")
+        if not args.dataset:
+            synthetic_processed_data(args.rows).to_csv(path)
+
+        model = Model(path, snapshot_dir=None, sentiment_backend="lexicon")
+        baseline = pd.read_csv(path, engine="python")
+        baseline["text"] = baseline["text"].astype(str)
+        baseline["polarity"] = model.data["polarity"].astype("float64")
+        baseline["sadness"] = model.data["sadness"]
+        baseline["hashtags"] = model.data["hashtags"]
+
+    report = model.memory_report()
+    report["inferred dtype"] = baseline.dtypes.astype(str)
+    report["inferred bytes"] = baseline.memory_usage(deep=True, index=False)
+    report["distinct"] = model.data.apply(lambda column: column.astype(str).nunique())
+    print(report.to_string())
+    total = report["bytes"].sum()
+    inferred_total = baseline.memory_usage(deep=True, index=False).sum()
+    print(
+        "\ntotal: {:.1f} MB with the schema, {:.1f} MB with inferred dtypes and every column ({:.1f}x)".format(
+            total / 1e6, inferred_total / 1e6, inferred_total / total
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Agreement and speed report of the lexicon polarity backend against TextBlob.
+
+For every processed dataset found, both backends score the tweets and the report gives the mean
+absolute error, the Pearson correlation, the agreement on the sign of the polarity (negative,
+neutral, positive) and on the 'sadness' flag, and the time each backend took. The lexicon backend
+is then timed alone on the tweets repeated up to --rows rows.
+
+Usage (from the repository root):
+    python -m benchmarks.sentiment_agreement --rows 1200000
+"""
+import argparse
+import glob
+import time
+import numpy as np
+import pandas as pd
+from src.columnar_io import read_parquet
+from src.sentiment import LexiconSentimentScorer, SentimentEngine
+
+
+def load_texts(path: str) -> pd.Series:
+    if path.endswith(".parquet"):
+        return read_parquet(path, ["text"])["text"].astype(str)
+    return pd.read_csv(path, engine="python", usecols=["text"])["text"].astype(str)
+
+
+def timed(backend, texts: pd.Series) -> tuple:
+    start = time.perf_counter()
+    scores = backend.polarities(texts)
+    return scores.to_numpy(), time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="data/tweets_processed/*_PROCESSED.*")
+    parser.add_argument("--rows", type=int, default=1200000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted(path for path in glob.glob(args.data) if path.endswith((".csv", ".parquet")))
+    if not paths:
+        raise SystemExit("No processed dataset matches {}".format(args.data))
+
+    engine = SentimentEngine(workers=args.workers)
+    lexicon = LexiconSentimentScorer()
+    print(
+        "{:<60} {:>7} {:>6} {:>6} {:>6} {:>6} {:>10} {:>10}".format(
+            "dataset", "tweets", "MAE", "r", "sign", "sad", "textblob s", "lexicon s"
+        )
+    )
+    all_texts = []
+    for path in paths:
+        texts = load_texts(path)
+        all_texts.append(texts)
+        reference, reference_time = timed(engine, texts)
+        approximation, approximation_time = timed(lexicon, texts)
+        print(
+            "{:<60} {:>7} {:>6.3f} {:>6.3f} {:>6.1%} {:>6.1%} {:>10.2f} {:>10.2f}".format(
+                path[-60:],
+                len(texts),
+                np.abs(reference - approximation).mean(),
+                np.corrcoef(reference, approximation)[0, 1],
+                (np.sign(reference) == np.sign(approximation)).mean(),
+                ((reference < 0) == (approximation < 0)).mean(),
+                reference_time,
+                approximation_time,
+            )
+        )
+
+    texts = pd.concat(all_texts, ignore_index=True)
+    repeats = -(-args.rows // len(texts))
+    texts = pd.concat([texts] * repeats, ignore_index=True).iloc[: args.rows]
+    _, seconds = timed(lexicon, texts)
+    print("lexicon backend on {} rows: {:.2f} s ({:.0f} tweets/s)".format(len(texts), seconds, len(texts) / seconds))
+
+
+if __name__ == "__main__":
+    main()
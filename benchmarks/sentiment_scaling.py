@@ -0,0 +1,58 @@
+"""
+Measure how the throughput of the sentiment engine scales with the number of worker processes.
+
+The baseline is the original per-row path, which ran TextBlob twice per tweet (once for the
+polarity and once for the sadness column) through DataFrame.apply.
+
+Usage (from the repository root):
+    python -m benchmarks.sentiment_scaling --rows 200000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+from textblob import TextBlob
+from benchmarks.load_formats import synthetic_processed_data
+from src.sentiment import SentimentEngine
+
+
+def per_row(texts) -> None:
+    texts.apply(lambda x: TextBlob(x).sentiment.polarity)
+    texts.apply(lambda x: TextBlob(x).sentiment.polarity < 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    workers = args.workers or sorted({1, 2, 4, 8, cpu_count} & set(range(1, cpu_count + 1)))
+    texts = synthetic_processed_data(args.rows)["text"]
+    print("{} tweets, {} distinct, {} CPUs".format(len(texts), texts.nunique(), cpu_count))
+    print("{:>22} {:>10} {:>14} {:>9}".format("path", "time (s)", "tweets/s", "speedup"))
+
+    reference = None
+    if not args.skip_baseline:
+        start = time.perf_counter()
+        per_row(texts)
+        reference = time.perf_counter() - start
+        print("{:>22} {:>10.2f} {:>14.0f} {:>8.1f}x".format("per-row apply (x2)", reference, len(texts) / reference, 1.0))
+
+    for count in workers:
+        engine = SentimentEngine(workers=count, chunk_size=args.chunk_size)
+        start = time.perf_counter()
+        engine.polarities(texts)
+        seconds = time.perf_counter() - start
+        reference = reference or seconds
+        print(
+            "{:>22} {:>10.2f} {:>14.0f} {:>8.1f}x".format(
+                "engine, {} worker(s)".format(count), seconds, len(texts) / seconds, reference / seconds
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
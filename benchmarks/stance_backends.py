@@ -0,0 +1,74 @@
+"""
+Throughput and parity of the stance classifier backends on the CPU.
+
+The tweets of the datasets found are classified with each backend of DataPreProcessor ('fp32' and
+'int8'). The report gives the time and throughput of each backend and, for the quantized one, the
+agreement of its classes with the full precision model and the largest difference between the
+logits. With --validation, the parity check of the quantized backend is also run on the labelled
+validation file (see DataPreProcessor.check_parity).
+
+Usage (from the repository root):
+    python -m benchmarks.stance_backends --model ml/model --rows 5000 --validation data/dataset_training_ml.csv
+"""
+import argparse
+import glob
+import time
+import numpy as np
+import pandas as pd
+import torch
+from src.columnar_io import read_parquet
+from src.data_pre_processor import DataPreProcessor
+
+
+def load_texts(path: str) -> pd.Series:
+    if path.endswith(".parquet"):
+        return read_parquet(path, ["text"])["text"].astype(str)
+    return pd.read_csv(path, engine="python", usecols=["text"])["text"].astype(str)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="data/tweets_processed/*_PROCESSED.*")
+    parser.add_argument("--model", default="ml/model")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--validation", default=None)
+    args = parser.parse_args()
+
+    paths = sorted(path for path in glob.glob(args.data) if path.endswith((".csv", ".parquet")))
+    if not paths:
+        raise SystemExit("No processed dataset matches {}".format(args.data))
+    texts = pd.concat([load_texts(path) for path in paths], ignore_index=True)
+    texts = texts.sample(min(args.rows, len(texts)), random_state=0).tolist()
+
+    print("{} tweets, {} threads".format(len(texts), torch.get_num_threads()))
+    print("{:<8} {:>10} {:>10} {:>10} {:>12}".format("backend", "seconds", "tweets/s", "agreement", "max logit Δ"))
+    reference = None
+    for backend in DataPreProcessor.BACKENDS:
+        # With a chunksize, the processor only loads the model
+        processor = DataPreProcessor(
+            paths[0], chunksize=1, model_path=args.model, batch_size=args.batch_size, backend=backend
+        )
+        start = time.perf_counter()
+        logits = processor.predict_logits(texts)
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference = logits
+        print(
+            "{:<8} {:>10.2f} {:>10.1f} {:>10.2%} {:>12.2e}".format(
+                backend,
+                seconds,
+                len(texts) / seconds,
+                (logits.argmax(axis=1) == reference.argmax(axis=1)).mean(),
+                np.abs(logits - reference).max(),
+            )
+        )
+
+    if args.validation:
+        print("parity of the int8 backend on {}:".format(args.validation))
+        for name, value in processor.check_parity(args.validation).items():
+            print("    {}: {}".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Throughput and agreement of the length-bucketed stance inference against full padding.
+
+The tweets of the datasets found are classified twice by the BERT model: as the preprocessor did
+before, padded to the longest tweet of the whole dataset and run in batches of 64, and with
+DataPreProcessor.predict_logits, which pads each batch of tweets of similar lengths to its own
+longest tweet. The report gives the share of padding tokens, the time and throughput of each path,
+the agreement of the predicted classes and the largest difference between the logits.
+
+Usage (from the repository root):
+    python -m benchmarks.stance_padding --model ml/model --rows 5000 --batch-size 64
+"""
+import argparse
+import glob
+import time
+import numpy as np
+import pandas as pd
+import torch
+from src.columnar_io import read_parquet
+from src.data_pre_processor import DataPreProcessor
+
+
+def load_texts(path: str) -> pd.Series:
+    if path.endswith(".parquet"):
+        return read_parquet(path, ["text"])["text"].astype(str)
+    return pd.read_csv(path, engine="python", usecols=["text"])["text"].astype(str)
+
+
+def fully_padded_logits(processor: DataPreProcessor, texts: list) -> tuple:
+    """
+    Classify the tweets as the preprocessor did before, every tweet padded to the longest one.
+
+    Returns:
+        tuple: The logits and the share of padding tokens.
+    """
+    tokens = processor.tokenizer(texts, max_length=128, padding=True, truncation=True, return_tensors="pt")
+    logits = []
+    with torch.no_grad():
+        for start in range(0, len(texts), 64):
+            outputs = processor.model(
+                tokens["input_ids"][start : start + 64].to(processor.device),
+                attention_mask=tokens["attention_mask"][start : start + 64].to(processor.device),
+            )
+            logits.append(outputs.logits.cpu().numpy())
+    return np.concatenate(logits), 1 - tokens["attention_mask"].float().mean().item()
+
+
+def bucketed_padding(processor: DataPreProcessor, texts: list) -> float:
+    """
+    Compute the share of padding tokens of the length-bucketed batches.
+    """
+    lengths = np.sort([len(ids) for ids in processor.tokenizer(texts, max_length=128, truncation=True)["input_ids"]])
+    batches = [lengths[start : start + processor.batch_size] for start in range(0, len(lengths), processor.batch_size)]
+    padded = sum(batch.max() * len(batch) for batch in batches)
+    return 1 - lengths.sum() / padded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="data/tweets_processed/*_PROCESSED.*")
+    parser.add_argument("--model", default="ml/model")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    paths = sorted(path for path in glob.glob(args.data) if path.endswith((".csv", ".parquet")))
+    if not paths:
+        raise SystemExit("No processed dataset matches {}".format(args.data))
+    texts = pd.concat([load_texts(path) for path in paths], ignore_index=True)
+    texts = texts.sample(min(args.rows, len(texts)), random_state=0).tolist()
+
+    # With a chunksize, the processor only loads the model
+    processor = DataPreProcessor(paths[0], chunksize=1, model_path=args.model, batch_size=args.batch_size)
+
+    start = time.perf_counter()
+    reference, reference_padding = fully_padded_logits(processor, texts)
+    reference_time = time.perf_counter() - start
+    start = time.perf_counter()
+    logits = processor.predict_logits(texts)
+    bucketed_time = time.perf_counter() - start
+
+    print("{:<16} {:>8} {:>10} {:>10}".format("path", "padding", "seconds", "tweets/s"))
+    for name, padding, seconds in (
+        ("full padding", reference_padding, reference_time),
+        ("bucketed", bucketed_padding(processor, texts), bucketed_time),
+    ):
+        print("{:<16} {:>8.1%} {:>10.2f} {:>10.1f}".format(name, padding, seconds, len(texts) / seconds))
+    print(
+        "{} tweets, speed-up x{:.2f}, class agreement {:.2%}, max logit difference {:.2e}".format(
+            len(texts),
+            reference_time / bucketed_time,
+            (reference.argmax(axis=1) == logits.argmax(axis=1)).mean(),
+            np.abs(reference - logits).max(),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import sqlite3
+import numpy as np
+
+
+class ClassificationCache:
+    """
+    A persistent cache of the stance predictions of the BERT model, stored in a SQLite database.
+
+    Entries are keyed by a hash of the model version and of the normalized text of a tweet (see
+    DataPreProcessor.normalize_text), and hold the predicted class and the logits. A text is only
+    classified the first time it is seen: its repeats in the same run and in later runs, including
+    retweets that differ only by their links, are served from the database.
+
+    Attributes:
+        path (str): The SQLite database file.
+        model_version (str): The fingerprint of the model whose predictions are stored.
+        lookups (int): Number of tweets looked up.
+        hits (int): Number of tweets served without running the model.
+        misses (int): Number of distinct texts the model had to classify.
+    """
+
+    # Maximum number of keys in one SQL query
+    QUERY_SIZE = 500
+
+    def __init__(self, path: str, model_version: str) -> None:
+        self.path = path
+        self.model_version = model_version
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS classifications (key TEXT PRIMARY KEY, position INTEGER, logits BLOB)"
+        )
+        self._connection.commit()
+
+    def key(self, text: str) -> str:
+        """
+        Build the key of a normalized text for the model version.
+        """
+        digest = hashlib.sha256(self.model_version.encode())
+        digest.update(b"\0")
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    def load(self, keys: list) -> dict:
+        """
+        Load the stored logits of the given keys.
+
+        Returns:
+            dict: The logits of each key found.
+        """
+        found = {}
+        for start in range(0, len(keys), self.QUERY_SIZE):
+            batch = keys[start : start + self.QUERY_SIZE]
+            rows = self._connection.execute(
+                "SELECT key, logits FROM classifications WHERE key IN ({})".format(",".join("?" * len(batch))),
+                batch,
+            )
+            found.update((key, np.frombuffer(logits, dtype=np.float32)) for key, logits in rows)
+        return found
+
+    def store(self, keys: list, logits: np.ndarray) -> None:
+        """
+        Store the logits of the given keys and their predicted classes.
+        """
+        logits = logits.astype(np.float32)
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO classifications (key, position, logits) VALUES (?, ?, ?)",
+            ((key, int(row.argmax()), row.tobytes()) for key, row in zip(keys, logits)),
+        )
+        self._connection.commit()
+
+    def classify(self, texts: list, normalized: list, predict) -> np.ndarray:
+        """
+        Get the logits of tweets, running the model only on the texts that were never classified.
+
+        Args:
+            texts (list): The tweets, as given to the model.
+            normalized (list): The normalized text of each tweet, which identifies its repeats.
+            predict (callable): Called with a list of tweets, returns their logits, one row per tweet.
+
+        Returns:
+            np.ndarray: The logits of each tweet, one row per tweet.
+        """
+        if not texts:
+            return predict(texts)
+        keys = [self.key(text) for text in normalized]
+        first = {}
+        for i, key in enumerate(keys):
+            first.setdefault(key, i)
+        logits = self.load(list(first))
+        missing = [key for key in first if key not in logits]
+        if missing:
+            # Each missing text is classified once, from its first tweet
+            predicted = predict([texts[first[key]] for key in missing])
+            self.store(missing, predicted)
+            logits.update(zip(missing, predicted))
+
+        self.lookups += len(texts)
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return np.stack([logits[key] for key in keys])
+
+    def stats(self) -> dict:
+        """
+        Report the usage of the cache since it was opened.
+
+        Returns:
+            dict: The lookups, hits, misses, hit rate and number of stored texts.
+        """
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "entries": self._connection.execute("SELECT COUNT(*) FROM classifications").fetchone()[0],
+        }
+
+    def close(self) -> None:
+        self._connection.close()
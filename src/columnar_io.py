@@ -0,0 +1,120 @@
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Declared Arrow types of the processed tweet files. Columns that are not listed here
+# keep the type Arrow infers for them.
+PROCESSED_SCHEMA = {
+    "username": pa.string(),
+    "acctdesc": pa.string(),
+    "location": pa.string(),
+    "followers": pa.int64(),
+    "usercreatedts": pa.string(),
+    "tweetcreatedts": pa.string(),
+    "retweetcount": pa.int64(),
+    "text": pa.string(),
+    "hashtags": pa.list_(pa.string()),
+    "language": pa.string(),
+    "favorite_count": pa.int64(),
+    "tweet": pa.string(),
+    "country": pa.string(),
+    "ISO": pa.string(),
+    "conflict_position": pa.int8(),
+}
+
+COUNT_COLUMNS = ["followers", "retweetcount", "favorite_count"]
+
+# The 'text' value of each hashtag entity in the raw export, e.g. "[{'text': 'Ukraine', 'indices': [0, 8]}]"
+HASHTAG_TEXT = re.compile(r"""['"]text['"]:\s*['"]([^'"]*)['"]""")
+
+
+def hashtag_texts(value) -> list:
+    """
+    Convert a raw 'hashtags' cell into the list of hashtag texts.
+
+    The raw Twitter export stores hashtags as the string representation of a list of dicts
+    (e.g. "[{'text': 'Ukraine', 'indices': [0, 8]}]"). The texts are pulled out with a single
+    regular expression instead of evaluating the whole structure. Values that are already lists
+    (as read from Parquet) keep their texts.
+
+    Parameters:
+    value: The raw cell value.
+
+    Returns:
+    list: The hashtag texts, or an empty list if the cell holds no hashtags.
+    """
+    if isinstance(value, str):
+        return HASHTAG_TEXT.findall(value)
+    if not isinstance(value, (list, np.ndarray)):
+        return []
+    return [tag["text"] if isinstance(tag, dict) else str(tag) for tag in value]
+
+
+def to_arrow_table(data: pd.DataFrame) -> pa.Table:
+    """
+    Convert a processed DataFrame into an Arrow table with the declared column types.
+
+    Count columns are coerced to integers, 'conflict_position' keeps its missing values as nulls
+    and 'hashtags' is stored as a native list of strings.
+
+    Parameters:
+    data (pd.DataFrame): The processed tweet data.
+
+    Returns:
+    pa.Table: The typed Arrow table.
+    """
+    data = data.copy()
+    for column in COUNT_COLUMNS:
+        if column in data.columns:
+            data[column] = pd.to_numeric(data[column], errors="coerce").fillna(0).astype("int64")
+    if "hashtags" in data.columns:
+        data["hashtags"] = data["hashtags"].apply(hashtag_texts)
+    if "conflict_position" in data.columns:
+        data["conflict_position"] = pd.to_numeric(data["conflict_position"], errors="coerce").astype("Int8")
+
+    schema = pa.Schema.from_pandas(data, preserve_index=False)
+    for i, field in enumerate(schema):
+        if field.name in PROCESSED_SCHEMA:
+            if PROCESSED_SCHEMA[field.name] == pa.string():
+                data[field.name] = data[field.name].astype("string")
+            schema = schema.set(i, pa.field(field.name, PROCESSED_SCHEMA[field.name]))
+    return pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+
+
+def write_parquet(data: pd.DataFrame, path: str) -> None:
+    """
+    Write a processed DataFrame to a Parquet file using the declared schema.
+
+    Parameters:
+    data (pd.DataFrame): The processed tweet data.
+    path (str): The destination file.
+    """
+    pq.write_table(to_arrow_table(data), path, compression="zstd")
+
+
+def read_parquet(path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Read a processed Parquet file, loading only the requested columns.
+
+    Requested columns that are missing from the file are ignored so callers can ask for
+    everything they might use. List-typed columns are returned as Python lists.
+
+    Parameters:
+    path (str): The Parquet file to read.
+    columns (list): The columns to load. If None, every column is loaded.
+
+    Returns:
+    pd.DataFrame: The loaded data.
+    """
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [column for column in columns if column in available]
+    table = pq.read_table(path, columns=columns)
+    data = table.to_pandas()
+    for name in table.column_names:
+        if pa.types.is_list(table.schema.field(name).type):
+            data[name] = table.column(name).to_pylist()
+    return data
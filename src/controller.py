@@ -1,20 +1,59 @@
-from src.model import Model
+from src.model_registry import ModelRegistry
+from src.polarity_time_series import PolarityTimeSeries
+from src.render_cache import RenderCache
+from src.term_counter import count_terms, count_weighted_terms
+from src import render_assets
+import os
+import threading
+from urllib.parse import urlencode
 import pandas as pd
 import matplotlib.pyplot as plt
-from matplotlib.colors import ListedColormap
-from wordcloud import WordCloud, STOPWORDS, ImageColorGenerator
+from wordcloud import WordCloud, STOPWORDS
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
-from PIL import Image
 from io import BytesIO
 import numpy as np
 import nltk
 import base64
 import spacy
-from spacy.lang.es.stop_words import STOP_WORDS as es_stopwords
 import plotly.express as px
 
 
+# Processed dataset of each date, in the order they are displayed
+DATASETS = {
+    "02/04": "data/tweets_processed/0402_UkraineCombinedTweetsDeduped_PROCESSED.csv",
+    "08/04": "data/tweets_processed/0408_UkraineCombinedTweetsDeduped_PROCESSED.csv",
+    "05/05 to 07/05": "data/tweets_processed/0505_to_0507_UkraineCombinedTweetsDeduped_PROCESSED.csv",
+    "19/08": "data/tweets_processed/0819_UkraineCombinedTweetsDeduped_PROCESSED.csv",
+    "31/08": "data/tweets_processed/0831_UkraineCombinedTweetsDeduped_PROCESSED.csv",
+    "08/09": "data/tweets_processed/0908_UkraineCombinedTweetsDeduped_PROCESSED.csv",
+    "15/09": "data/tweets_processed/0915_UkraineCombinedTweetsDeduped_PROCESSED.csv",
+}
+
+# Version of the wordcloud rendering code, part of the render cache keys
+WORDCLOUD_RENDER_VERSION = 3
+
+# Render parameters of the wordclouds, part of the render cache keys
+HASHTAG_WORDCLOUD = {
+    "width": 800,
+    "height": 400,
+    "normalize_plurals": True,
+    "background_color": "white",
+    "contour_width": 1,
+    "contour_color": "blue",
+    "colormap": "YlOrBr",
+    "mask": "src/wordclouds/drapeau-ukraine.png",
+}
+CLASSICAL_WORDCLOUD = {
+    "width": 800,
+    "height": 400,
+    "normalize_plurals": True,
+    "background_color": "white",
+    "colors": ["royalblue", "gold"],
+    "mask": "src/wordclouds/drapeau-ukraine.png",
+}
+
+
 class Controller:
     """
     A singleton controller class that manages different models for tweet data analysis.
@@ -24,7 +63,9 @@ class Controller:
 
     Attributes:
     _instance (Controller): A private class attribute to store the singleton instance.
-    models (dict): A dictionary mapping dates to corresponding Model instances.
+    models (ModelRegistry): A lazy registry mapping dates to corresponding Model instances.
+    polarity_time_series (PolarityTimeSeries): The country x date matrix of mean polarity, filled as models load or from the aggregates of the dates.
+    render_cache (RenderCache): The cache of rendered wordcloud images.
     """
 
     _instance = None
@@ -44,35 +85,88 @@ class Controller:
             # Initialize any attributes of the instance here if needed
         return cls._instance
 
-    def __init__(self):
-        # Initialization should only occur if the instance hasn't been initialized before
-        self.models = {
-            "02/04": Model(
-                "data/tweets_processed/0402_UkraineCombinedTweetsDeduped_PROCESSED.csv"
-            ),
-            "08/04": Model(
-                "data/tweets_processed/0408_UkraineCombinedTweetsDeduped_PROCESSED.csv"
-            ),
-            "05/05 to 07/05": Model(
-                "data/tweets_processed/0505_to_0507_UkraineCombinedTweetsDeduped_PROCESSED.csv"
-            ),
-            "19/08": Model(
-                "data/tweets_processed/0819_UkraineCombinedTweetsDeduped_PROCESSED.csv"
-            ),
-            "31/08": Model(
-                "data/tweets_processed/0831_UkraineCombinedTweetsDeduped_PROCESSED.csv"
-            ),
-            "08/09": Model(
-                "data/tweets_processed/0908_UkraineCombinedTweetsDeduped_PROCESSED.csv"
-            ),
-            "15/09": Model(
-                "data/tweets_processed/0915_UkraineCombinedTweetsDeduped_PROCESSED.csv"
-            ),
-        }
+    def __init__(self, max_models: int = None, max_bytes: int = None):
+        """
+        Register the processed dataset of each date. Models are built lazily, the first time a
+        date is requested, and at most 'max_models' models or 'max_bytes' bytes stay resident.
+
+        Args:
+        max_models (int): Maximum number of resident models, or None for no limit.
+        max_bytes (int): Maximum resident DataFrame size in bytes, or None for no limit.
+        """
+        self.polarity_time_series = PolarityTimeSeries(DATASETS)
+        self._polarity_lock = threading.Lock()
+        self.render_cache = RenderCache("data/render_cache")
+        self.models = ModelRegistry(
+            {date: self.dataset_path(path) for date, path in DATASETS.items()},
+            max_models=max_models,
+            max_bytes=max_bytes,
+            on_load=self.on_model_loaded,
+        )
+
+    def preload_models(self, dates: list = None, workers: int = None) -> dict:
+        """
+        Load the models of several dates concurrently, in worker processes (see ModelRegistry.load_all).
+
+        Args:
+        dates (list): The dates to load. Defaults to every date.
+        workers (int): Number of worker processes, or None for one per CPU.
+
+        Returns:
+        dict: The load time of each loaded date ('loaded') and the error of each date that failed ('failed').
+        """
+        return self.models.load_all(dates, workers)
+
+    def on_model_loaded(self, date: str, model) -> None:
+        """
+        Record the per-country polarity of a freshly loaded model in the polarity time series.
+        """
+        self.polarity_time_series.add_date(date, model.country_polarity)
+
+    def add_date(self, date: str, csv_path: str) -> None:
+        """
+        Register the processed dataset of a new date. It is loaded the first time it is requested.
+
+        Args:
+        date (str): The date, as displayed in the date dropdown.
+        csv_path (str): The path of the processed CSV file (a Parquet file next to it is preferred).
+        """
+        self.polarity_time_series.remove_date(date)
+        self.models.add_dataset(date, self.dataset_path(csv_path))
+        self.polarity_time_series.register_date(date)
+
+    def remove_date(self, date: str) -> None:
+        """
+        Remove a date, its model and its column of the polarity time series.
+
+        Args:
+        date (str): The date to remove.
+        """
+        self.models.remove_dataset(date)
+        self.polarity_time_series.remove_date(date)
+
+    @staticmethod
+    def dataset_path(csv_path: str) -> str:
+        """
+        Pick the file to load for a processed dataset.
+
+        The Parquet version written by DataPreProcessor is preferred when it exists next to the CSV,
+        since it is typed, stores hashtags natively and can be read column by column.
+
+        Args:
+        csv_path (str): The path of the processed CSV file.
+
+        Returns:
+        str: The path of the Parquet file if it exists, otherwise the CSV path.
+        """
+        parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+        if os.path.exists(parquet_path):
+            return parquet_path
+        return csv_path
 
     def get_dates(self) -> list:
         """
-        Retrieve the dates for which models are available.
+        Retrieve the dates for which models are available. No dataset is loaded.
 
         Returns:
         list: A list of strings representing the dates for which models are available.
@@ -81,47 +175,150 @@ class Controller:
 
     
 
-    def generate_wordcloud(self, date: str) -> bytes:
+    def generate_wordcloud(self, date: str, scale: float = 1.0) -> str:
         """
         Generates a WordCloud based on hashtags in the DataFrame.
 
+        The PNG image is served from the render cache when it has already been rendered for the same
+        data and parameters.
+
         Args:
-                df (pandas.DataFrame): The DataFrame containing tweet data.
+                date (str): The date of the model to use.
+                scale (float): The size of the image relative to the mask, e.g. 0.5 for small viewports.
 
         Returns:
-                bytes: The binary data of the PNG image.
+                str: A base64 encoded data URI of the PNG image.
         Raises:
                 ValueError: If the 'hashtags' column is not present in the DataFrame.
         """
+        return self.png_data_uri(self.get_wordcloud_png(date, "wordcloud1", scale))
+
+    def generate_classical_wordcloud(self, date: str, scale: float = 1.0) -> str:
+        """
+        Generates a traditional word cloud for a specific date, considering all words in the tweets.
+
+        The PNG image is served from the render cache when it has already been rendered for the same
+        data and parameters.
+
+        Args:
+        date (str): The date for which the word cloud should be generated.
+        scale (float): The size of the image relative to the mask, e.g. 0.5 for small viewports.
+
+        Returns:
+        str: A base64 encoded data URI of the PNG image.
+        """
+        return self.png_data_uri(self.get_wordcloud_png(date, "wordcloud2", scale))
+
+    @staticmethod
+    def png_data_uri(img_binary: bytes) -> str:
+        """
+        Encode a PNG image as a data URI that can be used as the source of an image.
+        """
+        return f"data:image/png;base64,{base64.b64encode(img_binary).decode()}"
+
+    def wordcloud_renderer(self, kind: str) -> tuple:
+        """
+        Get the render method and the render parameters of a wordcloud type.
+
+        Raises:
+        KeyError: If the wordcloud type is unknown.
+        """
+        renderers = {
+            "wordcloud1": (self.render_hashtag_wordcloud, HASHTAG_WORDCLOUD),
+            "wordcloud2": (self.render_classical_wordcloud, CLASSICAL_WORDCLOUD),
+        }
+        return renderers[kind]
+
+    def wordcloud_key(self, date: str, kind: str, scale: float = 1.0) -> str:
+        """
+        Get the render cache key of a wordcloud.
+
+        The key combines the render version, the date, the wordcloud type, the fingerprint of the model
+        data, the render parameters and the scale, so it changes whenever the image would. The fingerprint
+        is computed without loading the model (see ModelRegistry.fingerprint).
+
+        Args:
+        date (str): The date of the model to use.
+        kind (str): 'wordcloud1' for the hashtags wordcloud, 'wordcloud2' for the words wordcloud.
+        scale (float): The size of the image relative to the mask.
+
+        Returns:
+        str: The hexadecimal key.
+        """
+        _, parameters = self.wordcloud_renderer(kind)
+        fingerprint = self.models.fingerprint(date)
+        return self.render_cache.key(WORDCLOUD_RENDER_VERSION, date, kind, fingerprint, parameters, scale)
+
+    def wordcloud_url(self, date: str, kind: str) -> str:
+        """
+        Get the URL the wordcloud image is served at (see View.setup_routes).
+
+        The URL carries the render cache key as a version, so it changes whenever the image does and
+        browsers can cache each URL forever.
+
+        Args:
+        date (str): The date of the model to use.
+        kind (str): 'wordcloud1' for the hashtags wordcloud, 'wordcloud2' for the words wordcloud.
+
+        Returns:
+        str: The path and query string of the image.
+        """
+        return f"/wordcloud/{kind}.png?" + urlencode({"date": date, "v": self.wordcloud_key(date, kind)})
+
+    def get_wordcloud_png(self, date: str, kind: str, scale: float = 1.0) -> bytes:
+        """
+        Get the PNG image of a wordcloud, rendering it only if it is not in the render cache.
+
+        The date's model is only loaded when the image has to be rendered.
+
+        Args:
+        date (str): The date of the model to use.
+        kind (str): 'wordcloud1' for the hashtags wordcloud, 'wordcloud2' for the words wordcloud.
+        scale (float): The size of the image relative to the mask.
+
+        Returns:
+        bytes: The binary data of the PNG image.
+        """
+        render, _ = self.wordcloud_renderer(kind)
+        key = self.wordcloud_key(date, kind, scale)
+        return self.render_cache.get_or_render(key, lambda: render(self.models[date], scale))
+
+    def render_hashtag_wordcloud(self, model, scale: float = 1.0) -> bytes:
+        """
+        Render the hashtags wordcloud of a model.
 
-        df=self.models[date].data
+        The wordcloud is generated from the hashtag frequencies the model precomputes from its exploded
+        hashtag table, so no hashtag list is concatenated. Each distinct hashtag is tokenized once and the
+        words go through the same cleaning as WordCloud.generate (see src.term_counter.count_weighted_terms):
+        stopwords are dropped and the case variants and plurals of a hashtag are merged. The mask and its
+        colors are shared render assets (see src.render_assets).
+
+        Args:
+                model (Model): The model of the date.
+                scale (float): The size of the image relative to the mask.
+
+        Returns:
+                bytes: The binary data of the PNG image.
+        Raises:
+                ValueError: If the 'hashtags' column is not present in the DataFrame.
+        """
         # Check if the 'hashtags' column exists in the DataFrame
-        if "hashtags" not in df.columns:
+        if "hashtags" not in model.data.columns:
             raise ValueError("La colonne 'hashtags' n'existe pas dans le DataFrame.")
 
-        # Concatenate all hashtags into a single string
-        all_hashtags = " ".join(df["hashtags"].sum())
+        # Number of occurrences of each hashtag word, with the default WordCloud stopwords
+        parameters = dict(HASHTAG_WORDCLOUD)
+        hashtag_counts = model.hashtag_counts[model.hashtag_counts > 0].to_dict()
+        frequencies = count_weighted_terms(hashtag_counts, STOPWORDS, parameters.pop("normalize_plurals"))
 
-        # Load the Ukrainian flag image as a mask
-        mask = Image.open("src/wordclouds/drapeau-ukraine.png").convert("RGBA")
-        white_bg = Image.new("RGBA", mask.size, "WHITE")
-        white_bg.paste(mask, (0, 0), mask)
-        white_bg.convert("RGB")
-        ukraine_shape_mask = np.array(white_bg)
-        ukraine_coloring = np.array(Image.open("src/wordclouds/drapeau-ukraine.png"))
+        # Ukrainian flag image as a mask
+        mask_path = parameters.pop("mask")
+        mask = render_assets.load_mask(mask_path, scale)
 
         # Create the WordCloud with the Ukrainian flag mask and specific colors
-        wordcloud = WordCloud(
-            width=800,
-            height=400,
-            background_color="white",
-            mask=ukraine_shape_mask,
-            contour_width=1,
-            contour_color="blue",
-            colormap="YlOrBr",
-        ).generate(all_hashtags)
+        wordcloud = WordCloud(mask=mask, **parameters).generate_from_frequencies(frequencies)
 
-        image_colors = ImageColorGenerator(ukraine_coloring)
+        image_colors = render_assets.mask_colors(mask_path, scale)
 
         # Create a BytesIO buffer to save the WordCloud image
         img_buffer = BytesIO()
@@ -132,54 +329,38 @@ class Controller:
         )
 
         # Get the binary data of the PNG image
-        img_binary = img_buffer.getvalue()
-        img_src = f"data:image/png;base64,{base64.b64encode(img_binary).decode()}"
-        return img_src
-    
-    def generate_classical_wordcloud(self,date: str) -> bytes:
+        return img_buffer.getvalue()
+
+    def render_classical_wordcloud(self, model, scale: float = 1.0) -> bytes:
         """
-        Generates a traditional word cloud for a specific date, considering all words in the tweets.
+        Render the words wordcloud of a model.
+
+        The words of the tweets are counted one tweet at a time (see src.term_counter.count_terms) and the
+        counts feed the wordcloud, instead of joining every tweet into one string for WordCloud to tokenize.
+        The stopwords, colormap and mask are shared render assets (see src.render_assets).
 
         Args:
-        date (str): The date for which the word cloud should be generated.
+        model (Model): The model of the date.
+        scale (float): The size of the image relative to the mask.
 
         Returns:
-        str: A base64 encoded string of the PNG image of the WordCloud.
+        bytes: The binary data of the PNG image.
         """
-
-        df = self.models[date].data
-        # Creating stopwords list
-        stopwords = set(STOPWORDS)
-        stopwords.add("https")
-        stopwords.add("t")
-        stopwords.add("co")
-        stopwords.add("will")
-        stopwords |= set(es_stopwords)  # Stopwords espagnols
-
-        # Creating a string containing all the tweets
-        text = " ".join(i for i in df["text"])
-
-        # Loading the Ukrainian flag image as a mask
-        mask = Image.open("src/wordclouds/drapeau-ukraine.png").convert("RGBA")
-        white_bg = Image.new("RGBA", mask.size, "WHITE")
-        white_bg.paste(mask, (0, 0), mask)
-        white_bg.convert("RGB")
-        ukraine_shape_mask = np.array(white_bg)
+        # Stopwords, including the Spanish ones
+        stopwords = render_assets.wordcloud_stopwords()
 
         # Colors of the wordcloud
-        custom_colors = ["royalblue", "gold"]
-        custom_cmap = ListedColormap(custom_colors)
+        parameters = dict(CLASSICAL_WORDCLOUD)
+        frequencies = count_terms(model.data["text"], stopwords, parameters.pop("normalize_plurals"))
+        custom_cmap = render_assets.colormap(tuple(parameters.pop("colors")))
+        mask = render_assets.load_mask(parameters.pop("mask"), scale)
 
         # Creating wordcloud
         wordcloud = WordCloud(
-            stopwords=stopwords,
-            height=400,
-            width=800,
-            mask=ukraine_shape_mask,
-            normalize_plurals=True,
+            mask=mask,
             colormap=custom_cmap,
-            background_color="white",
-        ).generate(text)
+            **parameters,
+        ).generate_from_frequencies(frequencies)
 
         # Creating a BytesIO buffer to save the WordCloud image
         img_buffer = BytesIO()
@@ -188,64 +369,121 @@ class Controller:
         wordcloud.to_image().save(img_buffer, format="PNG")
 
         # Getting the binary data of the PNG image
-        img_binary = img_buffer.getvalue()
-        img_src = f"data:image/png;base64,{base64.b64encode(img_binary).decode()}"
-        return img_src
+        return img_buffer.getvalue()
+
+    def get_barchart_data(self, date: str, option: str) -> pd.DataFrame:
+        """
+        Get the 10 most retweeted or most liked tweets of a date.
+
+        Args:
+        date (str): The date of the model to use.
+        option (str): 'retweets' for the most retweeted tweets, anything else for the most liked ones.
 
-    def get_barchart_data(self, date: str, option: str) -> dict:
+        Returns:
+        pd.DataFrame: The 'username' and 'count' of the tweets.
+        """
         model=self.models[date]
-        print(option)
         if option == "retweets":
-            return model.sort_retweets()
+            return model.top_k("retweets", 10)
         else:
-            return model.sort_by_favorite()
+            return model.top_k("likes", 10)
 
     def get_all_countries(self) -> list:
         """
         Retrieves the list of all countries in the dataset.
 
+        The countries are read from the datasets (see ModelRegistry.countries), so no model is built.
+
         Returns:
         list: A list of strings representing the countries in the dataset.
         """
-        countries = []
-        for date in self.models:
-            countries = countries + self.models[date].get_all_countries()
-        return list(set(countries))
-    
-    def plot_country_polarity_time(self, country: str):
+        countries = set()
+        for date in self.get_dates():
+            countries.update(self.models.countries(date))
+        return sorted(countries)
 
-        dates = list(self.models.keys())
+    def load_polarity_time_series(self) -> None:
+        """
+        Fill the columns of the dates that are still missing from the polarity time series.
 
-        dates[2] = '06/05'
-        dates = [date + "/2022" for date in dates]
-        polarities = [self.models[date].get_average_polarity_for_country(country) for date in self.models]
+        Only the per-country aggregates of the missing dates are computed (see ModelRegistry.country_polarity),
+        so their models are not made resident and the resident ones are not evicted.
+        """
+        with self._polarity_lock:
+            missing = self.polarity_time_series.missing_dates()
+            if not missing:
+                return
+            for date, country_polarity in self.models.country_polarity(missing).items():
+                self.polarity_time_series.add_date(date, country_polarity)
+
+    @staticmethod
+    def plot_date(date: str) -> pd.Timestamp:
+        """
+        Convert a date of the dropdown to the day used on the time axis.
 
-        
-        df = pd.DataFrame({'Date': dates, 'Polarity': polarities})
+        Ranges such as '05/05 to 07/05' are placed on their middle day.
+
+        Args:
+        date (str): The date, as displayed in the date dropdown.
+
+        Returns:
+        pd.Timestamp: The day of the date in 2022.
+        """
+        days = [pd.to_datetime(day.strip() + "/2022", format="%d/%m/%Y") for day in date.split(" to ")]
+        return days[0] + (days[-1] - days[0]) / 2
+
+    def plot_country_polarity_time(self, country) -> pd.DataFrame:
+        """
+        Get the average polarity over time of one or several countries.
+
+        The values are sliced from the polarity time series, so no dataset is scanned.
+
+        Args:
+        country (str or list): The country, or a list of countries for an overlay chart.
+
+        Returns:
+        pd.DataFrame: One row per (country, date), with 'Date', 'Country', 'Polarity' and 'Count' columns.
+        """
+        countries = [country] if isinstance(country, str) else list(country)
+        self.load_polarity_time_series()
+
+        df = self.polarity_time_series.get(countries)
         # Convert 'Date' column to datetime format
-        df['Date'] = pd.to_datetime(df['Date'], format="%d/%m/%Y")
+        df['Date'] = df['Date'].map(self.plot_date)
 
-        return df
+        return df.sort_values(['Country', 'Date'], kind='stable', ignore_index=True)
 
     def get_choropleth_data(self, date: str, is_pro_russian:str) -> tuple:
         """
-        Generates a DataFrame containing the polarity of each country.
+        Get the number of pro-Russian or pro-Ukrainian tweets of each country.
+
+        Both options are served from the stance table the model builds when it loads.
 
         Args:
                 date (str): The date of the model to use.
+                is_pro_russian (str): 'option1' for pro-Russian tweets, anything else for pro-Ukrainian ones.
 
         Returns:
-                pandas.DataFrame: The DataFrame containing the polarity of each country.
+                tuple: The ISO codes, the counts and the names of the countries.
         """
-        
+        model = self.models[date]
+        return model.get_number_pro_ukr_rus(is_pro_russian == "option1")
 
-        if is_pro_russian=="option1":
-            is_pro_russian=True
-        else:
-            is_pro_russian=False
+    def get_choropleth_stances(self, date: str) -> dict:
+        """
+        Get the number of pro-Russian and pro-Ukrainian tweets of each country, for both options of the
+        choropleth map at once.
 
-        model = self.models[date]
-        return model.get_number_pro_ukr_rus(is_pro_russian)
+        Args:
+                date (str): The date of the model to use.
+
+        Returns:
+                dict: The 'locations' (ISO codes) and 'countries' of the map, and the counts of each option
+                ('option1' for pro-Russian tweets, 'option2' for pro-Ukrainian ones), in the same order.
+        """
+        locations, pro_russian, countries = self.get_choropleth_data(date, "option1")
+        _, pro_ukrainian, _ = self.get_choropleth_data(date, "option2")
+        return {"locations": locations, "countries": countries, "option1": pro_russian, "option2": pro_ukrainian}
 
     def get_polarity_over_time(self, country:str):
         """
@@ -254,14 +492,11 @@ class Controller:
         Args:
         country (str): The country for which the polarity over time should be plotted.
         """
-        # Getting the average polarity for each day (so each dataframe)
-        average_polarities = []
-        dates = ['02/04','08/04','05/05','19/08','31/08','08/09','15/09']
-        for model in self.models:
-            average_polarities.append(model.get_average_polarity_for_country(country))
-        
+        # Getting the average polarity for each day from the polarity time series
+        df = self.plot_country_polarity_time(country)
+
         # Displaying the graph
-        plt.plot(dates,average_polarities)
+        plt.plot(df['Date'], df['Polarity'])
         plt.xlabel('Date')
         plt.ylabel('Average polarity of the tweets from the country')
         plt.show()
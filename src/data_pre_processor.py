@@ -4,13 +4,23 @@ import re
 import os
 import pycountry
 import geonamescache
-import swifter
 from functools import lru_cache
 import torch
 import ast
+import hashlib
+import json
+import shutil
 from transformers import BertTokenizer, BertForSequenceClassification
-from torch.utils.data import DataLoader, TensorDataset
 from tqdm import tqdm
+import pyarrow.parquet as pq
+from src.classification_cache import ClassificationCache
+from src.columnar_io import write_parquet
+from src.snapshot_cache import SnapshotCache
+
+# Hyperlinks in the text of the tweets
+LINKS = re.compile(
+    r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+)
 
 class DataPreProcessor:
     """
@@ -27,79 +37,241 @@ class DataPreProcessor:
         gc (geonamescache.GeonamesCache): GeonamesCache instance for geocoding.
         countries (dict): Dictionary of country data from GeonamesCache.
         pc (pycountry.db): Pycountry database instance for country information.
+        output_format (str): Format of the processed file, either 'csv' or 'parquet'.
+        chunksize (int): Number of raw rows processed at a time, or None to load the whole file at once.
+        sample (float): Fraction of the rows kept, or None to keep every row.
+        seed (int): Seed of the sampling. Each chunk is sampled with its own seed derived from it.
+        model_path (str): Directory of the pre-trained BERT model and tokenizer.
+        output_dir (str): Directory of the processed files.
+        batch_size (int): Number of tweets classified at a time by the BERT model.
+        backend (str): How the BERT model runs, 'fp32' (full precision, on MPS when available) or
+            'int8' (linear layers dynamically quantized to int8, on the CPU).
+        classification_cache (ClassificationCache): The stored predictions of the model, or None to
+            classify every tweet (see apply_tweet_position).
+
+    With a chunksize, the raw file is not loaded in __init__: preprocess_data reads it in chunks of
+    'chunksize' rows and runs every step on each chunk, so the memory used is bounded by the size of
+    a chunk instead of the size of the file. Each processed chunk is committed as a part file listed
+    in a manifest (see stream), so an interrupted run resumes from its first unfinished chunk.
     """
 
-    def __init__(self, dataset: pd.DataFrame) -> None:
-        self.data = pd.read_csv(dataset, low_memory=False).sample(20000)
+    OUTPUT_FORMATS = ("csv", "parquet")
+    BACKENDS = ("fp32", "int8")
+
+    def __init__(
+        self,
+        dataset: str,
+        output_format: str = "csv",
+        chunksize: int = None,
+        sample: float = None,
+        seed: int = None,
+        model_path: str = "../ml/model",
+        output_dir: str = "../data/tweets_processed/",
+        batch_size: int = 64,
+        backend: str = "fp32",
+        classification_cache: str = None,
+    ) -> None:
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(
+                "Unknown output format '{}', expected one of {}".format(output_format, self.OUTPUT_FORMATS)
+            )
+        if backend not in self.BACKENDS:
+            raise ValueError("Unknown backend '{}', expected one of {}".format(backend, self.BACKENDS))
+        if sample is not None and not 0 < sample <= 1:
+            raise ValueError("The sampled fraction must be in (0, 1], got {}".format(sample))
 
         self.route = dataset
+        self.output_format = output_format
+        self.chunksize = chunksize
+        self.sample = sample
+        self.seed = seed
+        self.model_path = model_path
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.backend = backend
+        self.data = None
+        if chunksize is None:
+            self.data = self.prepare(pd.read_csv(dataset, low_memory=False), 0)
+
         self.cache = {
             "New York": "USA",
             "England": "GBR",
             "NYC": "USA",
             "Boston": "USA",
         }
-        self.data["location"] = self.data["location"].astype(str)
         self.gc = geonamescache.GeonamesCache()
         self.countries = self.gc.get_countries()
         self.pc = pycountry.countries
         self.loadModel()
+        self.classification_cache = None
+        if classification_cache is not None:
+            self.classification_cache = ClassificationCache(classification_cache, self.model_version())
 
     def loadModel(self) -> None:
         """
         Loads the pre-trained BERT model and tokenizer.
 
+        With the 'int8' backend, the weights of the linear layers are quantized to int8 and their
+        activations are quantized on the fly, which makes CPU inference faster (see check_parity
+        for the agreement with the full precision model).
+
         Returns:
             None: Simply loads and prepares the model and tokenizer for use.
         """
         self.model = BertForSequenceClassification.from_pretrained(
-            "../ml/model"
+            self.model_path
         )  # Load out pre-trained model
-        self.tokenizer = BertTokenizer.from_pretrained("../ml/model")
-        self.device = torch.device(
-            "mps" if torch.backends.mps.is_available() else "cpu"
-        )  # Optimise the model for the device
-        self.model.to(self.device)
+        self.tokenizer = BertTokenizer.from_pretrained(self.model_path)
         self.model.eval()  # Load the model in eval/production mode
+        if self.backend == "int8":
+            # Quantized kernels only run on the CPU
+            self.device = torch.device("cpu")
+            self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            self.device = torch.device(
+                "mps" if torch.backends.mps.is_available() else "cpu"
+            )  # Optimise the model for the device
+        self.model.to(self.device)
 
-    
-    def apply_tweet_position(self) -> None:
+    def model_version(self) -> str:
         """
-        Classifies the text in the 'text' column of the instance's DataFrame using our pre-trained BERT model.
+        Fingerprint the model files and the backend, which determine the predictions of the model.
 
-        This method tokenizes the text using the batch_encode_plus method of the tokenizer,
-        processes it in batches using a DataLoader, and applies the pre-trained model to
-        each batch to predict the sentiment/conflict position. The predictions are then
-        appended to the DataFrame in a new column 'conflict_position'.
         Returns:
-            None: Modifies the instance's DataFrame in place, adding a 'conflict_position' column with predictions.
+            str: The hexadecimal fingerprint.
+        """
+        digest = hashlib.sha256(self.backend.encode())
+        for name in sorted(os.listdir(self.model_path)):
+            path = os.path.join(self.model_path, name)
+            if os.path.isfile(path):
+                digest.update(name.encode())
+                digest.update(SnapshotCache.file_hash(path).encode())
+        return digest.hexdigest()[:32]
+
+    def check_parity(self, validation_path: str) -> dict:
+        """
+        Compare the predictions of the loaded backend with the full precision model on a validation file.
+
+        Args:
+            validation_path (str): A CSV file with a 'text' column and, optionally, the 'sentiment' labels of the
+                training dataset (-1 for pro-Ukrainian tweets, stored as 2 by the model).
+
+        Returns:
+            dict: The number of tweets, the share of tweets given the same class by both models and the largest
+                difference between their logits, plus the accuracy of each model when the file has labels.
+        """
+        validation = pd.read_csv(validation_path)
+        texts = validation["text"].astype(str).tolist()
+        reference = BertForSequenceClassification.from_pretrained(self.model_path).eval().to(self.device)
+        logits = self.predict_logits(texts)
+        reference_logits = self.predict_logits(texts, reference)
+
+        parity = {
+            "rows": len(texts),
+            "agreement": float((logits.argmax(axis=1) == reference_logits.argmax(axis=1)).mean()),
+            "max_logit_difference": float(np.abs(logits - reference_logits).max()),
+        }
+        if "sentiment" in validation.columns:
+            labels = validation["sentiment"].replace(-1, 2).to_numpy()
+            parity["accuracy"] = float((logits.argmax(axis=1) == labels).mean())
+            parity["reference_accuracy"] = float((reference_logits.argmax(axis=1) == labels).mean())
+        return parity
+
+    def prepare(self, data: pd.DataFrame, index: int) -> pd.DataFrame:
+        """
+        Sample the rows of a raw chunk and prepare its columns for the preprocessing steps.
+
+        Args:
+            data (pd.DataFrame): The raw rows.
+            index (int): The position of the chunk in the file, which seeds its sampling.
+
+        Returns:
+            pd.DataFrame: The rows to process.
+        """
+        if self.sample is not None:
+            seed = None if self.seed is None else self.seed + index
+            data = data.sample(frac=self.sample, random_state=seed)
+        # str() keeps missing locations as "nan", which geocode expects
+        data["location"] = data["location"].map(str)
+        return data
+
+    def chunks(self):
+        """
+        Iterate over the raw data to process, in chunks of 'chunksize' rows.
+
+        Without a chunksize, the data loaded in __init__ is the only chunk.
+
+        Yields:
+            pd.DataFrame: The rows of each chunk, sampled and prepared (see prepare).
+        """
+        if self.chunksize is None:
+            yield self.data
+            return
+        with pd.read_csv(self.route, chunksize=self.chunksize, low_memory=False) as reader:
+            for index, chunk in enumerate(reader):
+                yield self.prepare(chunk, index)
+
+    def predict_logits(self, texts: list, model: BertForSequenceClassification = None) -> np.ndarray:
         """
-        tokens = self.tokenizer.batch_encode_plus(
-            self.data["text"].tolist(),
-            max_length=128,
-            padding=True,
-            truncation=True,
-            return_tensors="pt",
-        )  # Tokenize the whole dataset
+        Run our pre-trained BERT model on tweets, in batches of tweets of similar lengths.
 
-        dataset = TensorDataset(tokens["input_ids"], tokens["attention_mask"])
-        dataloader = DataLoader(
-            dataset, batch_size=64
-        )  # Prepare the dataloader for batch processing
+        The tweets are tokenized without padding and sorted by number of tokens. Each batch of
+        'batch_size' consecutive tweets is then padded to its own longest tweet only, so the model
+        does not spend its time on padding tokens, and the logits are put back in the order of the
+        tweets. Only the tensors of one batch are built at a time.
+
+        Args:
+            texts (list): The tweets to classify.
+            model (BertForSequenceClassification): The model to run, the loaded one by default.
+
+        Returns:
+            np.ndarray: The logits of each tweet, one row per tweet.
+        """
+        model = self.model if model is None else model
+        input_ids = self.tokenizer(texts, max_length=128, truncation=True)["input_ids"]
+        order = np.argsort([len(ids) for ids in input_ids], kind="stable")
+        logits = np.empty((len(texts), model.config.num_labels), dtype=np.float32)
 
-        positions = []
         with torch.no_grad():
-            for batch in tqdm(dataloader, desc="Processing batches"):  # Make the predictions in batch
-                input_ids, attention_mask = [
-                    b.to(self.device) for b in batch
-                ]  # Load the tensors in the selected device
-                outputs = self.model(input_ids, attention_mask=attention_mask)
-                logits = outputs.logits
-                preds = torch.argmax(logits, dim=1).cpu().numpy()
-                positions.extend(preds)
+            for start in tqdm(range(0, len(order), self.batch_size), desc="Processing batches"):
+                batch = order[start : start + self.batch_size]
+                tokens = self.tokenizer.pad(
+                    {"input_ids": [input_ids[i] for i in batch]}, return_tensors="pt"
+                )  # Pad to the longest tweet of the batch
+                outputs = model(
+                    tokens["input_ids"].to(self.device), attention_mask=tokens["attention_mask"].to(self.device)
+                )
+                logits[batch] = outputs.logits.cpu().numpy()
+        return logits
+
+    @staticmethod
+    def normalize_text(text) -> str:
+        """
+        Normalize the text of a tweet so that its repeats, e.g. retweets with other links, get the same text.
+
+        Links are removed and whitespace is collapsed.
+        """
+        return " ".join(re.sub(LINKS, "", str(text)).split())
 
+    def apply_tweet_position(self) -> None:
+        """
+        Classifies the text in the 'text' column of the instance's DataFrame using our pre-trained BERT model.
+
+        The predictions (see predict_logits) are appended to the DataFrame in a new column 'conflict_position'.
+        With a classification cache, the model only runs on the tweets whose normalized text (see
+        normalize_text) it never classified, in this run or in a previous one.
+
+        Returns:
+            None: Modifies the instance's DataFrame in place, adding a 'conflict_position' column with predictions.
+        """
+        texts = self.data["text"].tolist()
+        if self.classification_cache is None:
+            logits = self.predict_logits(texts)
+        else:
+            normalized = [self.normalize_text(text) for text in texts]
+            logits = self.classification_cache.classify(texts, normalized, self.predict_logits)
         # Add the predictions to the dataset
-        self.data["conflict_position"] = positions
+        self.data["conflict_position"] = logits.argmax(axis=1)
 
     @lru_cache(maxsize=None)
     def geocode(self, location: str) -> str:
@@ -182,9 +354,7 @@ class DataPreProcessor:
         to country ISO codes, storing the results in a new 'country' column.
         """
 
-        self.data["country"] = self.data["location"].swifter.apply(
-            lambda x: self.geocode(x)
-        )
+        self.data["country"] = self.data["location"].map(self.geocode)
 
     @lru_cache(maxsize=None)
     def iso2_to_name(self, country_iso: str) ->str:
@@ -203,8 +373,8 @@ class DataPreProcessor:
         This method uses the geocode function to convert location names in the DataFrame
         to country ISO codes, storing the results in a new 'country' column.
         """
-        self.data["ISO"] = self.data["ISO"].astype(str)
-        self.data["country"] = self.data["ISO"].swifter.apply(lambda x: self.iso2_to_name(x))
+        self.data["ISO"] = self.data["ISO"].map(str)
+        self.data["country"] = self.data["ISO"].map(self.iso2_to_name)
 
     @lru_cache(maxsize=None)
     def country_iso(self, country: str) -> str:
@@ -223,7 +393,7 @@ class DataPreProcessor:
         if country == "xk":
             return "XKX"
 
-        if country == "nan" or country == None:
+        if country == "nan" or pd.isna(country):
             return None
 
         try:
@@ -241,9 +411,7 @@ class DataPreProcessor:
         to their ISO codes, storing the results in a new 'ISO' column.
         """
 
-        self.data["ISO"] = self.data["country"].swifter.apply(
-            lambda x: self.country_iso(x)
-        )
+        self.data["ISO"] = self.data["country"].map(self.country_iso)
 
     def delete_links(self) -> None:
         """
@@ -255,13 +423,9 @@ class DataPreProcessor:
         Returns:
             None
         """
-        # Use a regular expression to find links
-        regex_liens = re.compile(
-            r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
-        )
         # Replace links with empty string
         self.data["tweet"] = self.data["text"].apply(
-            lambda x: re.sub(regex_liens, "", str(x))
+            lambda x: re.sub(LINKS, "", str(x))
         )
 
     def remove_unnecessary_columns(self) -> None:
@@ -295,6 +459,23 @@ class DataPreProcessor:
             if m in self.data.columns:
                 self.data.drop(m, inplace=True, axis=1)
 
+    def output_path(self, extension: str) -> str:
+        """
+        Build the path of the processed file, appending '_PROCESSED' to the original file name.
+
+        Args:
+            extension (str): The extension of the processed file, without the dot.
+
+        Returns:
+            str: The path of the processed file.
+        """
+        return os.path.join(
+            self.output_dir,
+            os.path.basename(self.route).replace(".csv", "")
+            + "_PROCESSED."
+            + extension,
+        )
+
     def back_to_csv(self) -> None:
         """
         Save the processed DataFrame back to a CSV file.
@@ -303,38 +484,210 @@ class DataPreProcessor:
         appending '_PROCESSED' to the original file name.
         """
 
-        self.data.to_csv(
-            "../data/tweets_processed/"
-            + os.path.basename(self.route).replace(".csv", "")
-            + "_PROCESSED.csv"
-        )
+        self.data.to_csv(self.output_path("csv"))
 
-    def preprocess_data(self) -> None:
+    def back_to_parquet(self) -> None:
         """
-        Execute the full preprocessing pipeline on the tweet data.
+        Save the processed DataFrame to a Parquet file.
 
-        This method sequentially calls other methods in the class to perform various preprocessing
-        steps like removing unnecessary columns, deleting links, applying geocoding, and converting
-        country names to ISO codes. It also prints the progress of each step.
+        The columns are written with their declared types (see src.columnar_io), and the
+        'hashtags' column is stored as a native list of strings so it does not need to be
+        parsed again when the dashboard loads it.
         """
 
-        print("starting preprocessing for {}...".format(os.path.basename(self.route)))
+        write_parquet(self.data, self.output_path("parquet"))
+
+    def save(self) -> None:
+        """
+        Save the processed DataFrame in the configured output format.
+        """
+        if self.output_format == "parquet":
+            self.back_to_parquet()
+        else:
+            self.back_to_csv()
+
+    def transform(self, verbose: bool = True) -> None:
+        """
+        Run the preprocessing steps on the current data.
+
+        This method sequentially calls other methods in the class to perform various preprocessing
+        steps like removing unnecessary columns, deleting links, applying geocoding, converting
+        country names to ISO codes and classifying the position of the tweets.
+
+        Args:
+            verbose (bool): Whether the end of each step is printed.
+        """
+        log = print if verbose else lambda message: None
         self.remove_unnecessary_columns()
-        print("done removing unnecessary columns")
+        log("done removing unnecessary columns")
         self.delete_links()
-        print("done deleting links")
+        log("done deleting links")
         self.apply_geocode()
-        print("done geocoding")
+        log("done geocoding")
         self.apply_iso()
         self.apply_name()
-        print('done applying iso')
+        log('done applying iso')
         self.apply_tweet_position()
-        print('done applying tweet position')
-        self.back_to_csv()
+        log('done applying tweet position')
+
+    def parts_directory(self) -> str:
+        """
+        Get the directory holding the processed chunks and the manifest of a streamed run.
+        """
+        return self.output_path("parts")
+
+    def settings(self) -> dict:
+        """
+        Describe what the processed chunks depend on: the source file contents and the chunking,
+        sampling and output options. A manifest written with other settings is not resumed.
+        """
+        return {
+            "source": SnapshotCache.file_hash(self.route),
+            "output_format": self.output_format,
+            "chunksize": self.chunksize,
+            "sample": self.sample,
+            "seed": self.seed,
+        }
+
+    def load_manifest(self) -> dict:
+        """
+        Load the manifest of a previous streamed run, if it can be resumed.
+
+        A sampled run without a seed adopts the seed recorded in the manifest, so the remaining
+        chunks are sampled as they would have been by the interrupted run.
+
+        Returns:
+            dict or None: The manifest, or None if there is none or it was written with other settings.
+        """
+        path = os.path.join(self.parts_directory(), "manifest.json")
+        try:
+            with open(path) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        settings = self.settings()
+        if self.seed is None:
+            settings["seed"] = manifest["settings"].get("seed")
+        if manifest["settings"] != settings:
+            return None
+        self.seed = settings["seed"]
+        return manifest
+
+    def write_manifest(self, manifest: dict) -> None:
+        """
+        Write the manifest of a streamed run, atomically.
+        """
+        path = os.path.join(self.parts_directory(), "manifest.json")
+        with open(path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def write_part(self, index: int) -> dict:
+        """
+        Write the current (processed) chunk as a part file, atomically.
+
+        Args:
+            index (int): The position of the chunk in the raw file.
+
+        Returns:
+            dict: The manifest entry of the part: its index, file name and number of rows.
+        """
+        name = "part-{:05d}.{}".format(index, self.output_format)
+        path = os.path.join(self.parts_directory(), name)
+        if self.output_format == "parquet":
+            write_parquet(self.data, path + ".tmp")
+        else:
+            self.data.to_csv(path + ".tmp", header=index == 0)
+        os.replace(path + ".tmp", path)
+        return {"index": index, "file": name, "rows": len(self.data)}
+
+    def merge_parts(self, manifest: dict) -> None:
+        """
+        Concatenate the parts of a finished streamed run into the processed file.
+
+        CSV parts are concatenated as they are (only the first one has a header). Parquet parts
+        become one row group each, with the column types of the first part.
+        """
+        path = self.output_path(self.output_format)
+        parts = [os.path.join(self.parts_directory(), part["file"]) for part in manifest["parts"]]
+        if self.output_format == "parquet":
+            writer = None
+            try:
+                for part in parts:
+                    table = pq.read_table(part)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path + ".tmp", table.schema, compression="zstd")
+                    writer.write_table(table.cast(writer.schema))
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            with open(path + ".tmp", "wb") as output:
+                for part in parts:
+                    with open(part, "rb") as file:
+                        shutil.copyfileobj(file, output)
+        os.replace(path + ".tmp", path)
+
+    def stream(self) -> None:
+        """
+        Preprocess the raw file chunk by chunk, committing each processed chunk as a part file.
+
+        After each chunk, the part is written and recorded in 'manifest.json' (see parts_directory).
+        When a manifest of an interrupted run with the same settings exists, the chunks it lists are
+        skipped and the run continues from the first unfinished one. Once every chunk is processed,
+        the parts are merged into the processed file and removed, so the output is the same as the
+        one of an uninterrupted run.
+        """
+        manifest = self.load_manifest()
+        if manifest is None:
+            shutil.rmtree(self.parts_directory(), ignore_errors=True)
+            os.makedirs(self.parts_directory())
+            if self.sample is not None and self.seed is None:
+                # Recorded in the manifest, so a resumed run samples the remaining chunks the same way
+                self.seed = int(np.random.SeedSequence().generate_state(1)[0])
+            manifest = {"settings": self.settings(), "parts": []}
+            self.write_manifest(manifest)
+        elif manifest["parts"]:
+            print("resuming after {} completed chunks".format(len(manifest["parts"])))
+
+        completed = len(manifest["parts"])
+        rows = sum(part["rows"] for part in manifest["parts"])
+        for index, chunk in enumerate(self.chunks()):
+            if index < completed:
+                continue
+            self.data = chunk
+            self.transform(verbose=False)
+            manifest["parts"].append(self.write_part(index))
+            self.write_manifest(manifest)
+            rows += len(self.data)
+            print("done preprocessing chunk {} ({} rows so far)".format(index, rows))
+
+        self.merge_parts(manifest)
+        shutil.rmtree(self.parts_directory())
+
+    def preprocess_data(self) -> None:
+        """
+        Execute the full preprocessing pipeline on the tweet data and save the result.
+
+        Without a chunksize, the steps run on the whole data loaded in __init__ (see transform), and
+        the progress of each step is printed. With a chunksize, the file is streamed (see stream).
+        """
+
+        print("starting preprocessing for {}...".format(os.path.basename(self.route)))
+        if self.chunksize is None:
+            self.transform()
+            self.save()
+        else:
+            self.stream()
+        if self.classification_cache is not None:
+            stats = self.classification_cache.stats()
+            print(
+                "classification cache: {hits} of {lookups} tweets served ({hit_rate:.1%}), "
+                "{misses} texts classified, {entries} stored".format(**stats)
+            )
         print("done preprocessing for {}".format(os.path.basename(self.route)))
         print("-----------------------------------")
 
-
 if __name__ == "__main__":
     Data = [
         "../data/Tweets Ukraine/0408_UkraineCombinedTweetsDeduped.csv",
@@ -346,7 +699,12 @@ if __name__ == "__main__":
         "../data/Tweets Ukraine/0915_UkraineCombinedTweetsDeduped.csv",
     ]
     for fichier in Data:
-        D = DataPreProcessor(fichier)
+        D = DataPreProcessor(
+            fichier,
+            output_format="parquet",
+            chunksize=50000,
+            classification_cache="../data/classification_cache.sqlite",
+        )
 
         D.preprocess_data()
 
@@ -2,40 +2,49 @@ from dash import dcc
 from src.controller import Controller
 
 class DropdownCreator:
+    # Options and default values of the dropdowns, also used to pre-warm the dashboard
+    DEFAULT_DATE = '02/04'
+    CHOROPLETH_OPTIONS = [{'label': 'Pro Russian Tweet', 'value': 'option1'}, {'label': 'Pro Ukrainian tweet', 'value': 'option2'}]
+    DEFAULT_CHOROPLETH_OPTION = 'option1'
+    WORDCLOUD_OPTIONS = [{'label': 'Hashtags Wordcloud', 'value': 'wordcloud1'}, {'label': 'Nouns Wordcloud', 'value': 'wordcloud2'}]
+    DEFAULT_WORDCLOUD_OPTION = 'wordcloud1'
+    DEFAULT_COUNTRY = 'US'
+    BAR_CHART_OPTIONS = [{'label': 'Retweets', 'value': 'retweets'}, {'label': 'Likes (in thousands)', 'value': 'likes'}]
+    DEFAULT_BAR_CHART_OPTION = 'likes'
     
     def create_date_dropdown(self, dates):
         return dcc.Dropdown(
             id='date-dropdown',
             options=[{'label': date, 'value': date} for date in dates],
-            value='02/04'
+            value=self.DEFAULT_DATE
         )
     
     def create_choropleth_option_dropdown(self):
         return dcc.Dropdown(
             id='choropleth-option-dropdown',
-            options=[{'label': 'Pro Russian Tweet', 'value': 'option1'}, {'label': 'Pro Ukrainian tweet', 'value': 'option2'}],
-            value='option1'
+            options=self.CHOROPLETH_OPTIONS,
+            value=self.DEFAULT_CHOROPLETH_OPTION
         )
         
     def create_wordcloud_dropdown(self,id):
         return dcc.Dropdown(
             id=id,
-            options=[{'label': 'Hashtags Wordcloud', 'value': 'wordcloud1'}, {'label': 'Nouns Wordcloud', 'value': 'wordcloud2'}],
-            value='wordcloud1'
+            options=self.WORDCLOUD_OPTIONS,
+            value=self.DEFAULT_WORDCLOUD_OPTION
         )
 
     def create_country_dropdown(self, countries):
         return dcc.Dropdown(
             id='country-dropdown',
             options=[{'label': country, 'value': country} for country in countries],
-            value='US'
+            value=self.DEFAULT_COUNTRY
         )
     
     def create_bar_chart_dropdown(self):
         return dcc.Dropdown(
             id='bar-chart-dropdown',
-            options=[{'label': 'Retweets', 'value': 'retweets'}, {'label': 'Likes (in thousands)', 'value': 'likes'}],
-            value='likes'
+            options=self.BAR_CHART_OPTIONS,
+            value=self.DEFAULT_BAR_CHART_OPTION
         )
     
         
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+
+class FigureCache:
+    """
+    An in-memory cache of serialized Plotly figures.
+
+    Entries are keyed by the chart type and a fingerprint of the data the chart is built from (see
+    key()), so a figure is built and serialized to JSON once per distinct input and never needs to be
+    invalidated. The cache keeps the figure as the plain dict parsed from that JSON, so hits are
+    returned as they are and Dash sends them without going through the Plotly encoder again. The
+    returned dicts are shared and must not be modified. The cache is an LRU bounded by the total
+    size of the figures' JSON.
+
+    Attributes:
+        max_bytes (int): Maximum total size of the stored JSON.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to build the figure.
+    """
+
+    def __init__(self, max_bytes: int = 32 << 20) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(data) -> str:
+        """
+        Hash the input data of a chart.
+
+        Args:
+            data: A DataFrame, or JSON-serializable values such as the lists of the choropleth map.
+
+        Returns:
+            str: The hexadecimal fingerprint.
+        """
+        digest = hashlib.sha256()
+        if isinstance(data, pd.DataFrame):
+            digest.update(json.dumps([list(data.columns), list(data.dtypes)], default=str).encode())
+            digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        else:
+            digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    @classmethod
+    def key(cls, chart: str, data) -> str:
+        """
+        Build the key of a figure from the chart type and its input data.
+        """
+        return chart + ":" + cls.fingerprint(data)
+
+    def get_or_build(self, chart: str, data, build) -> dict:
+        """
+        Get the serialized figure of a chart, building it if it is not cached.
+
+        Args:
+            chart (str): The chart type, e.g. 'choropleth'.
+            data: The input data of the chart.
+            build (callable): Called without arguments to build the plotly Figure on a miss. It may
+                also return a dict holding figures, such as the choropleth store.
+
+        Returns:
+            dict: The figure, as parsed from its JSON. It is shared and must not be modified.
+        """
+        key = self.key(chart, data)
+        with self._lock:
+            if key in self._figures:
+                self.hits += 1
+                self._figures.move_to_end(key)
+                return self._figures[key][0]
+            self.misses += 1
+
+        figure_json = to_json_plotly(build())
+        figure = json.loads(figure_json)
+        with self._lock:
+            if key not in self._figures:
+                self._figures[key] = (figure, len(figure_json))
+                self._bytes += len(figure_json)
+                while self._bytes > self.max_bytes and len(self._figures) > 1:
+                    _, (_, size) = self._figures.popitem(last=False)
+                    self._bytes -= size
+            return self._figures[key][0]
+
+    def stats(self) -> dict:
+        """
+        Report the usage of the cache.
+
+        Returns:
+            dict: The hits, misses, hit rate, number of figures and their total size in bytes.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "figures": len(self._figures),
+                "bytes": self._bytes,
+            }
@@ -1,9 +1,10 @@
 import pandas as pd
-from textblob import TextBlob
-import torch
-import ast
-from transformers import BertTokenizer, BertForSequenceClassification
-from torch.utils.data import DataLoader, TensorDataset
+import hashlib
+import inspect
+from importlib.metadata import version
+from src.columnar_io import read_parquet, hashtag_texts
+from src.snapshot_cache import SnapshotCache
+from src.sentiment import SentimentEngine, LexiconSentimentScorer, polarity_chunk
 
 
 class Model:
@@ -11,27 +12,250 @@ class Model:
     """
     The Model class that handles the processing and analysis of the dataset.
 
-    This class reads a CSV file into a DataFrame, samples a subset of the data, and drops unnecessary columns.
+    This class reads a processed CSV or Parquet file into a DataFrame and derives the polarity,
+    sadness and hashtag columns. The derived DataFrame is saved as a snapshot on the first load,
+    and later loads of the same file read the snapshot instead of deriving the columns again.
+    A Model can also be built around a DataFrame already derived elsewhere, such as in a worker
+    process, by passing it as 'data' along with its 'fingerprint'.
     It provides methods to perform sentiment analysis, geolocation, and other data processing tasks.
 
     Attributes:
         data (pd.DataFrame): The DataFrame holding the dataset.
+        snapshots (SnapshotCache): The snapshot cache, or None if snapshots are disabled.
+        sentiment (SentimentEngine or LexiconSentimentScorer): The backend computing the polarity column.
+        columns (list): The dataset columns the model uses.
+        drop_unused (bool): Whether the other dataset columns are dropped at load time.
+        fingerprint (str): A hash of the source file and of the derivation code.
     """
 
-    def __init__(self, dataset: pd.DataFrame) -> None:
+    # Bump this when the derived columns change in a way the code fingerprint cannot see
+    DERIVATION_VERSION = 1
+
+    # Methods whose code determines the derived DataFrame stored in snapshots
+    DERIVATION_STEPS = [
+        "read_dataset",
+        "derive",
+        "polarity",
+        "add_polarity",
+        "add_sadness",
+        "extract_hashtags",
+        "apply_schema",
+    ]
+
+    # Columns used by the dashboard, the only ones read from columnar files
+    COLUMNS = [
+        "username",
+        "location",
+        "text",
+        "hashtags",
+        "retweetcount",
+        "favorite_count",
+        "country",
+        "ISO",
+        "conflict_position",
+    ]
+
+    # Declared dtypes of the loaded data: categoricals for low-cardinality strings, downcast counts
+    # and float32 polarity. Columns that are not listed keep the dtype pandas infers: near-unique
+    # strings such as 'username' and the free-text 'location' stay object.
+    DTYPES = {
+        "country": "category",
+        "ISO": "category",
+        "language": "category",
+        "followers": "int32",
+        "retweetcount": "int32",
+        "favorite_count": "int32",
+        "conflict_position": "Int8",
+        "polarity": "float32",
+    }
+
+    # Bar chart metrics and the column each of them ranks
+    METRICS = {"likes": "favorite_count", "retweets": "retweetcount"}
+
+    # Polarity backends selectable with the 'sentiment_backend' option
+    SENTIMENT_BACKENDS = ("textblob", "lexicon")
+
+    # Derivation fingerprint of each (columns, sentiment backend, drop_unused) option set
+    _derivation_fingerprints = {}
+
+    def __init__(
+        self,
+        dataset: str,
+        columns: list = None,
+        snapshot_dir: str = "data/snapshots",
+        workers: int = None,
+        chunk_size: int = 2000,
+        sentiment_backend: str = "textblob",
+        drop_unused: bool = True,
+        data: pd.DataFrame = None,
+        fingerprint: str = None,
+    ) -> None:
+        if sentiment_backend not in self.SENTIMENT_BACKENDS:
+            raise ValueError(
+                "Unknown sentiment backend '{}', expected one of {}".format(sentiment_backend, self.SENTIMENT_BACKENDS)
+            )
         print("Loading dataset...")
-        self.data = pd.read_csv(dataset, engine='python')
+        if sentiment_backend == "lexicon":
+            # Vectorized approximation of TextBlob, see benchmarks/sentiment_agreement.py
+            self.sentiment = LexiconSentimentScorer()
+        else:
+            self.sentiment = SentimentEngine(workers, chunk_size)
+        self.snapshots = SnapshotCache(snapshot_dir) if snapshot_dir else None
+        self.columns = columns if columns is not None else self.COLUMNS
+        self.drop_unused = drop_unused
+        # Already derived data, e.g. built by a worker process (see ModelRegistry.load_all)
+        self.data = data
+
+        # Identifies the source file and the derivation code, keys snapshots and rendered artifacts
+        self.fingerprint = fingerprint or SnapshotCache.key(dataset, self.derivation_fingerprint(columns))
+        if self.data is None and self.snapshots is not None:
+            self.data = self.snapshots.load(dataset, self.fingerprint)
+
+        if self.data is None:
+            self.data = self.read_dataset(dataset, columns)
+            self.derive()
+            if self.snapshots is not None:
+                self.snapshots.save(dataset, self.fingerprint, self.data)
+        self.build_indexes()
+        print("Done!")
+
+    def derive(self) -> None:
+        """
+        Compute the derived columns (polarity, sadness and hashtag lists) of the loaded data.
+        """
         self.data['text'] = self.data['text'].astype(str)
         self.add_polarity()
         self.add_sadness()
         self.extract_hashtags()
-        print("Done!")
+        self.apply_schema()
+
+    def apply_schema(self) -> None:
+        """
+        Convert the columns of the dataset to the dtypes declared in DTYPES.
+
+        If 'drop_unused' is set, the columns that are neither requested (see COLUMNS) nor derived are dropped first.
+        Missing counts become 0, and missing stances stay missing.
+        """
+        if self.drop_unused:
+            kept = set(self.columns) | {"polarity", "sadness"}
+            self.data = self.data.drop(columns=[column for column in self.data.columns if column not in kept])
+
+        for column, dtype in self.DTYPES.items():
+            if column not in self.data.columns:
+                continue
+            values = self.data[column]
+            if dtype.startswith(("int", "Int", "float")):
+                values = pd.to_numeric(values, errors="coerce")
+                if dtype.startswith("int"):
+                    values = values.fillna(0)
+            self.data[column] = values.astype(dtype)
+
+    def memory_report(self) -> pd.DataFrame:
+        """
+        Report the memory used by each column of the dataset.
+
+        Returns:
+        pd.DataFrame: The 'dtype' and 'bytes' (deep size) of each column, indexed by column name.
+        """
+        sizes = self.data.memory_usage(deep=True, index=False)
+        return pd.DataFrame({"dtype": self.data.dtypes.astype(str), "bytes": sizes})
+
+    def build_indexes(self) -> None:
+        """
+        Build the lookup structures used by the dashboard queries.
+
+        This method must be called again whenever 'data' changes.
+        """
+        self.build_country_index()
+        self.build_hashtag_index()
+        self.build_stance_table()
+        self._top_k_cache = {}
+
+    def derivation_fingerprint(self, columns: list = None) -> str:
+        """
+        Fingerprint the code that derives the DataFrame, used to invalidate snapshots.
+
+        The fingerprint covers DERIVATION_VERSION, the source code of the DERIVATION_STEPS methods,
+        of the hashtag parser and of the sentiment backend, the TextBlob version, the declared dtypes
+        and the kept columns.
+
+        Parameters:
+        columns (list): The columns requested from the dataset.
+
+        Returns:
+        str: The hexadecimal fingerprint.
+        """
+        return self.code_fingerprint(columns, type(self.sentiment), self.drop_unused)
+
+    @classmethod
+    def code_fingerprint(cls, columns: list, sentiment: type, drop_unused: bool) -> str:
+        """
+        Fingerprint the derivation code for a set of options (see derivation_fingerprint).
+
+        The fingerprint is computed once per process for each set of options.
+
+        Parameters:
+        columns (list): The columns requested from the dataset.
+        sentiment (type): The class of the sentiment backend.
+        drop_unused (bool): Whether the unused columns are dropped.
+
+        Returns:
+        str: The hexadecimal fingerprint.
+        """
+        memo_key = (cls, repr(columns), sentiment, drop_unused)
+        if memo_key not in cls._derivation_fingerprints:
+            parts = [str(cls.DERIVATION_VERSION), version("textblob"), repr(columns), repr(cls.DTYPES), repr(drop_unused)]
+            parts += [inspect.getsource(getattr(cls, name)) for name in cls.DERIVATION_STEPS]
+            parts += [inspect.getsource(code) for code in (hashtag_texts, polarity_chunk, sentiment)]
+            cls._derivation_fingerprints[memo_key] = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+        return cls._derivation_fingerprints[memo_key]
+
+    @classmethod
+    def source_fingerprint(
+        cls, dataset: str, columns: list = None, sentiment_backend: str = "textblob", drop_unused: bool = True
+    ) -> str:
+        """
+        Compute the fingerprint a Model of a dataset gets with the given options, without loading it.
+
+        The fingerprint only needs the (memoized) hash of the source file and the derivation fingerprint,
+        so rendered artifacts can be keyed on it while the model is not resident.
+
+        Parameters:
+        dataset (str): The path of the processed file.
+        columns (list): The columns requested from the dataset.
+        sentiment_backend (str): The polarity backend, one of SENTIMENT_BACKENDS.
+        drop_unused (bool): Whether the unused columns are dropped.
+
+        Returns:
+        str: The fingerprint, equal to the 'fingerprint' of such a Model.
+        """
+        sentiment = LexiconSentimentScorer if sentiment_backend == "lexicon" else SentimentEngine
+        return SnapshotCache.key(dataset, cls.code_fingerprint(columns, sentiment, drop_unused))
+
+    def read_dataset(self, dataset: str, columns: list = None) -> pd.DataFrame:
+        """
+        Read a processed dataset from disk.
+
+        Parquet files (written by DataPreProcessor with output_format='parquet') are read with
+        column projection, so only the columns listed in COLUMNS (or in 'columns') are loaded.
+        Any other file is read as CSV.
+
+        Parameters:
+        dataset (str): The path of the processed file.
+        columns (list): The columns to load from a Parquet file. Defaults to COLUMNS.
+
+        Returns:
+        pd.DataFrame: The loaded data.
+        """
+        if str(dataset).endswith(".parquet"):
+            return read_parquet(dataset, columns if columns is not None else self.COLUMNS)
+        return pd.read_csv(dataset, engine='python')
 
     def polarity(self, tweet: str):
         """
         Calculate the polarity of a given text.
 
-        This method uses a sentiment analysis model to calculate the polarity of the input text.
+        This method uses the selected sentiment backend to calculate the polarity of the input text.
         The polarity is a float between -1.0 and 1.0, where -1.0 means very negative sentiment, 0 means neutral sentiment, and 1.0 means very positive sentiment.
 
         Parameters:
@@ -42,90 +266,121 @@ class Model:
         """
         if tweet == None:
             return 0
-        blob = TextBlob(tweet)
-        return blob.sentiment.polarity
+        return float(self.sentiment.polarities(pd.Series([tweet])).iloc[0])
+
+    def build_country_index(self) -> None:
+        """
+        Index the tweets by country.
+
+        This method groups the dataset by the 'country' column once, and stores the row positions of each
+        country in 'country_rows' and the sum, count and mean of the polarity of each country in
+        'country_polarity'. Tweets without a country are left out.
+        """
+        groups = self.data.groupby("country", sort=False, observed=True)
+        self.country_rows = groups.indices
+        self.country_polarity = groups["polarity"].agg(["sum", "count", "mean"])
 
     def get_all_countries(self) -> list:
-        return self.data["country"].unique().tolist()
-        
+        return self.country_polarity.index.tolist()
+
+    @staticmethod
+    def read_countries(dataset: str) -> list:
+        """
+        Read the countries of a processed dataset without building its Model.
+
+        Only the 'country' column is read, and nothing is derived, so the country list of every date
+        is available without loading the dates (see ModelRegistry.countries).
+
+        Parameters:
+        dataset (str): The path of the processed file.
+
+        Returns:
+        list: The distinct countries of the dataset, in the same order as get_all_countries.
+        """
+        if str(dataset).endswith(".parquet"):
+            countries = read_parquet(dataset, ["country"])["country"]
+        else:
+            countries = pd.read_csv(dataset, usecols=["country"])["country"]
+        return countries.dropna().astype(str).unique().tolist()
+
     def get_average_polarity_for_country(self, country: str) -> float:
         """
-        Calculate the average polarity per country.
+        Get the average polarity of the tweets of a country.
 
-        This method uses the 'polarity' and 'country' attributes of the tweets in the dataset.
-        It calculates the average polarity for each country and returns a dictionary where the keys are country names and the values are the average polarity.
+        This method looks the country up in the country index built at load time, so it does not scan the dataset.
+        The country is matched against the 'country' column, the one get_all_countries lists.
+
+        Parameters:
+        country (str): The country name.
 
         Returns:
-        float: float mapping country names to average polarity.
+        float: The average polarity of the country, or 0 if the country has no tweets.
         """
-        if country not in self.get_all_countries():
+        if country not in self.country_polarity.index:
             return 0
-            
-        return self.data[self.data["location"] == country]["polarity"].mean()
+
+        return self.country_polarity.at[country, "mean"]
 
     def add_polarity(self) -> None:
         """
         Add a 'polarity' column to the dataset.
 
-        This method applies the 'polarity' method to the 'text' column of the dataset, and stores the result in a new 'polarity' column.
+        The polarity of the 'text' column is computed by the sentiment engine, which analyses each distinct
+        tweet once and spreads the work over several processes, and stored in a new 'polarity' column.
         The 'polarity' column will contain the polarity of each tweet.
         """
-        self.data["polarity"] = self.data["text"].apply(lambda x: self.polarity(x))
+        self.data["polarity"] = self.sentiment.polarities(self.data["text"])
 
     def add_sadness(self) -> None:
-        self.data["sadness"] = self.data["text"].apply(lambda x: self.polarity(x) < 0)
-
-    def sort_by_favorite(self):
         """
-        Sorts the DataFrame based on the 'favorite_count' column in descending order.
+        Add a boolean 'sadness' column, True for tweets with a negative polarity.
 
-        This method first converts the 'favorite_count' column to integer type.
-        Then, it sorts the DataFrame stored in the 'data' attribute based on the 'favorite_count' column in descending order.
-        The sorted DataFrame is printed to the console.
+        This method must be called after add_polarity.
+        """
+        self.data["sadness"] = self.data["polarity"] < 0
 
-        Additionally, it extracts the usernames and favorite counts of the top 15 users with the most favorite tweets
-        and prints the list and a dictionary with usernames as keys and favorite counts as values.
-        Returns:
-            None
+    def top_k(self, metric: str = "likes", k: int = 10) -> pd.DataFrame:
         """
-        
-        # Convert 'favorite_count' column to integer
-        self.data["favorite_count"] = self.data["favorite_count"].astype(int)
+        Get the k tweets with the highest value of a metric.
 
-        # Sort DataFrame based on 'favorite_count' in descending order
-        df_sorted = self.data.sort_values(by="favorite_count", ascending=False)
-        df_sorted['count'] = df_sorted['favorite_count']
+        This method uses a partial selection (nlargest) instead of sorting the whole DataFrame, and memoizes
+        the result per (metric, k) until the data changes. The data itself is never modified.
 
-        # Extract the usernames of the top 15 users with the most favorite tweets
-        list_sorted_id = df_sorted[["username", "count"]].head(10)
+        Parameters:
+        metric (str): A key of METRICS ('likes' or 'retweets') or the name of a numeric column.
+        k (int): The number of tweets to return.
 
-        return list_sorted_id
+        Returns:
+        pd.DataFrame: The 'username' and 'count' of the k tweets, in descending order of count.
+        """
+        key = (metric, k)
+        if key not in self._top_k_cache:
+            values = self.data[self.METRICS.get(metric, metric)]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = pd.to_numeric(values, errors="coerce")
+            top = values.nlargest(k)
+            self._top_k_cache[key] = pd.DataFrame(
+                {"username": self.data.loc[top.index, "username"], "count": top}
+            )
+        return self._top_k_cache[key].copy()
 
-        # Convert the top_users DataFrame to a dictionary
-        user_likes_dict = top_users.set_index("username")["favorite_count"].to_dict()
+    def sort_by_favorite(self):
+        """
+        Get the 10 tweets with the most likes ('favorite_count' column).
 
-        # Print the dictionary
-        print("Dictionary of usernames and favorite counts:", user_likes_dict)
+        Returns:
+            pd.DataFrame: The 'username' and 'count' of the 10 most liked tweets.
+        """
+        return self.top_k("likes", 10)
 
     def sort_retweets(self):
         """
-        Sorts the DataFrame based on the 'retweetcount' column in descending order and prints the sorted DataFrame.
-
-        This method sorts the DataFrame stored in the 'data' attribute based on the 'retweetcount' column in descending order.
-        The sorted DataFrame is then printed to the console.
-
-        Additionally, it extracts the usernames of the top 20 users with the most retweets and prints the list.
+        Get the 10 tweets with the most retweets ('retweetcount' column).
 
         Returns:
-             None
+             pd.DataFrame: The 'username' and 'count' of the 10 most retweeted tweets.
         """
-
-        df_sorted = self.data.sort_values(by="retweetcount", ascending=False)
-        df_sorted['count'] = df_sorted['retweetcount']
-
-        # Extract the usernames of the top 10 users with the most retweets
-        top_10_retweets= df_sorted[["username", "count"]].head(10)
-        return top_10_retweets
+        return self.top_k("retweets", 10)
 
     def most_active_countries(self):
         """
@@ -195,8 +450,8 @@ class Model:
         This method checks if the 'hashtags' column exists in the DataFrame.
         If it doesn't, a ValueError is raised.
 
-        It then converts the JSON strings in the 'hashtags' column to Python lists,
-        and further processes the lists to extract the 'text' field of each hashtag.
+        It then extracts the 'text' field of each hashtag from the stringified lists in the 'hashtags' column,
+        in a single regular expression pass per row (see src.columnar_io.hashtag_texts).
         The extracted hashtags are stored in a new 'hashtags' column in the DataFrame.
 
         Returns:
@@ -205,13 +460,25 @@ class Model:
             ValueError: If the 'hashtags' column is not present in the DataFrame.
         """
 
-        # Convert JSON strings to Python lists
-        self.data["hashtags"] = self.data["hashtags"].apply(
-            lambda x: ast.literal_eval(x) if isinstance(x, str) else []
-        )
-        self.data["hashtags"] = self.data["hashtags"].apply(
-            lambda x: [tag["text"] for tag in x] if isinstance(x, list) else []
+        # Extract the hashtag texts (Parquet files already store lists of texts)
+        self.data["hashtags"] = self.data["hashtags"].apply(hashtag_texts)
+
+    def build_hashtag_index(self) -> None:
+        """
+        Build the exploded hashtag table and the hashtag frequencies of the dataset.
+
+        'hashtag_table' has one row per (tweet, hashtag), with the position of the tweet in 'row_id' and the
+        hashtag as a category, and 'hashtag_counts' holds the number of occurrences of each hashtag in
+        descending order. Consumers use them instead of walking the lists of the 'hashtags' column.
+        """
+        exploded = self.data["hashtags"].reset_index(drop=True).explode().dropna()
+        self.hashtag_table = pd.DataFrame(
+            {
+                "row_id": exploded.index.to_numpy(dtype="int32"),
+                "hashtag": pd.Categorical(exploded.astype(str)),
+            }
         )
+        self.hashtag_counts = self.hashtag_table["hashtag"].value_counts()
 
     def __str__(self) -> str:
         """
@@ -225,13 +492,42 @@ class Model:
         """
         return str(self.data)
 
+    def build_stance_table(self) -> None:
+        """
+        Count the stances of the tweets of each country.
+
+        This method builds 'stance_table', indexed by ISO code and country, with the number of pro-Russian
+        (conflict_position 1) and pro-Ukrainian (conflict_position 2) tweets, the number of tweets with a stance
+        ('total'), and the share of each camp. It is computed with one vectorized groupby over boolean columns.
+        Tweets without an ISO code or country are left out.
+        """
+        positions = self.data["conflict_position"]
+        flags = pd.DataFrame(
+            {
+                "pro_russian": (positions == 1).to_numpy(dtype=bool, na_value=False),
+                "pro_ukrainian": (positions == 2).to_numpy(dtype=bool, na_value=False),
+                "total": positions.notna().to_numpy(),
+            },
+            index=self.data.index,
+        )
+        table = flags.groupby([self.data["ISO"], self.data["country"]], observed=True).sum()
+        table["pro_russian_ratio"] = table["pro_russian"] / table["total"].where(table["total"] > 0)
+        table["pro_ukrainian_ratio"] = table["pro_ukrainian"] / table["total"].where(table["total"] > 0)
+        self.stance_table = table
+
+        iso_list = table.index.get_level_values("ISO").tolist()
+        countries_list = table.index.get_level_values("country").tolist()
+        self._stance_lists = {
+            True: (iso_list, table["pro_russian"].tolist(), countries_list),
+            False: (iso_list, table["pro_ukrainian"].tolist(), countries_list),
+        }
+
     def get_number_pro_ukr_rus(self, is_pro_russian: bool):
         """
         Calculate the number of pro-Russian or pro-Ukrainian stances by country.
 
-        This method groups the data by country and counts the number of instances
-        aligning with either a pro-Russian or pro-Ukrainian stance, based on the
-        'conflict_position' column in the dataset.
+        This method reads the counts from the stance table built at load time (see build_stance_table),
+        so it does not group the dataset again.
 
         Parameters:
         is_pro_russian (bool): A flag to determine the stance to be counted.
@@ -244,25 +540,8 @@ class Model:
             2. List of counts of the specified stance (pro-Russian or pro-Ukrainian) per country.
             3. List of country names.
         """
-        camp = 2
-
-        if is_pro_russian:
-            camp = 1
-        
-        # Grouping data by ISO and country, and counting the instances of the specified stance
-        polarity_df = (
-            self.data.groupby(["ISO", "country"])["conflict_position"]
-            .apply(lambda x: (x == camp).sum())
-            .reset_index()
-        )
-        # Filtering out rows where 'conflict_position' is NaN
-        polarity_df = polarity_df[polarity_df["conflict_position"].notna()]
-
-        # Extracting the list of ISO country codes, counts of specified stance, and country names
-        iso_list = polarity_df["ISO"].tolist()
-        polarity_list = polarity_df["conflict_position"].tolist()
-        countries_list = polarity_df["country"].tolist()
-        return iso_list, polarity_list, countries_list
+        iso_list, polarity_list, countries_list = self._stance_lists[bool(is_pro_russian)]
+        return list(iso_list), list(polarity_list), list(countries_list)
 
     def getData(self) -> pd.DataFrame:
         """
@@ -0,0 +1,414 @@
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from src.model import Model
+
+
+def worker_pool(workers: int = None) -> ProcessPoolExecutor:
+    """
+    Create a pool of worker processes to build models in.
+
+    The registry is used from the threads of the dashboard server, and forking a multithreaded process
+    can copy a lock held by another thread into the child, where it is never released. The workers are
+    therefore forked from a single-threaded 'forkserver' process that has already imported the models,
+    or started with 'spawn' where forkserver is not available.
+
+    Args:
+        workers (int): Number of worker processes, or None for one per CPU.
+
+    Returns:
+        ProcessPoolExecutor: The pool.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["src.model"])
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def build_frame(factory, dataset: str) -> tuple:
+    """
+    Build the Model of a dataset in a worker process, and return what the parent process needs to
+    rebuild it without deriving anything again.
+
+    The worker computes the polarity in its own process only, since the other workers load the
+    other dates at the same time.
+
+    Args:
+        factory (callable): Builds a Model from a dataset path.
+        dataset (str): The path of the processed dataset.
+
+    Returns:
+        tuple: The fingerprint of the model, its data, and the build time in seconds.
+    """
+    start = time.perf_counter()
+    model = factory(dataset, workers=1)
+    return model.fingerprint, model.getData(), time.perf_counter() - start
+
+
+def build_country_polarity(factory, dataset: str):
+    """
+    Build the Model of a dataset in a worker process, and return only its per-country polarity.
+
+    Args:
+        factory (callable): Builds a Model from a dataset path.
+        dataset (str): The path of the processed dataset.
+
+    Returns:
+        pd.DataFrame: The 'sum', 'count' and 'mean' of the polarity of each country (see
+            Model.build_country_index).
+    """
+    return factory(dataset, workers=1).country_polarity
+
+
+class ModelRegistry:
+    """
+    A lazy, memory-bounded registry of the Model of each date.
+
+    A date's Model is only built the first time it is requested, in the requesting thread and with
+    a single sentiment worker (see load_all for concurrent builds). At most 'max_models' models, or
+    'max_bytes' bytes of DataFrames, are kept resident; when a limit is exceeded the least recently
+    used models are evicted (the most recently requested one is always kept). Models are built
+    outside the registry lock, at most one build at a time per date: resident dates are served while
+    other dates build, and the requests for a date being built wait for that build. The registry
+    behaves like a read-only dict from dates to models, so 'registry[date]' and 'for date in
+    registry' work as before, and listing the dates never loads any data.
+
+    Attributes:
+        datasets (dict): Mapping of each date to the path of its processed dataset.
+        factory (callable): Builds a Model from a dataset path.
+        max_models (int): Maximum number of resident models, or None for no limit.
+        max_bytes (int): Maximum resident DataFrame size in bytes, or None for no limit.
+        on_load (callable): Called with (date, model) each time a model is built, or None.
+        hits (int): Number of requests served without building a model.
+        misses (int): Number of requests that had to build a model.
+        evictions (int): Number of models evicted.
+    """
+
+    def __init__(
+        self, datasets: dict, factory=Model, max_models: int = None, max_bytes: int = None, on_load=None
+    ) -> None:
+        self.datasets = dict(datasets)
+        self.factory = factory
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.on_load = on_load
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._countries = {}
+        # Future of the model of each date being built
+        self._building = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, date: str) -> Model:
+        return self.get(date)
+
+    def __contains__(self, date: str) -> bool:
+        return date in self.datasets
+
+    def __iter__(self):
+        return iter(self.datasets)
+
+    def __len__(self) -> int:
+        return len(self.datasets)
+
+    def keys(self):
+        return self.datasets.keys()
+
+    def get(self, date: str) -> Model:
+        """
+        Get the Model of a date, building it if it is not resident.
+
+        Args:
+            date (str): The date of the model.
+
+        Returns:
+            Model: The model of the date.
+
+        Raises:
+            KeyError: If no dataset is registered for the date.
+        """
+        with self._lock:
+            if date in self._models:
+                self.hits += 1
+                self._models.move_to_end(date)
+                return self._models[date]
+
+            if date not in self.datasets:
+                raise KeyError(date)
+            building = self._building.get(date)
+            if building is None:
+                self.misses += 1
+                path = self.datasets[date]
+                building = self._building[date] = Future()
+            else:
+                self.hits += 1
+                path = None
+
+        if path is None:
+            # Another request is building the model
+            return building.result()
+
+        try:
+            # Built in the calling thread: forking a sentiment pool from the server is not safe
+            model = self.factory(path, workers=1)
+        except BaseException as error:
+            with self._lock:
+                self._finish_build(date, building)
+            building.set_exception(error)
+            raise
+
+        with self._lock:
+            self._finish_build(date, building)
+            # The dataset may have been replaced or removed during the build
+            if self.datasets.get(date) == path:
+                self._add(date, model)
+                self._evict()
+        building.set_result(model)
+        return model
+
+    def _finish_build(self, date: str, building: Future) -> None:
+        # The date may have been removed, and is being built again, in the meantime
+        if self._building.get(date) is building:
+            del self._building[date]
+
+    def _add(self, date: str, model: Model) -> None:
+        self._models[date] = model
+        self._sizes[date] = int(model.getData().memory_usage(deep=True).sum())
+        if self.on_load is not None:
+            self.on_load(date, model)
+
+    def load_all(self, dates: list = None, workers: int = None) -> dict:
+        """
+        Build the models of several dates concurrently, in a pool of worker processes.
+
+        Each worker builds one date's Model and sends back its derived data (see build_frame), from
+        which the Model is rebuilt here without deriving the data again. The load time of each date
+        is printed. A date that fails to load is reported and does not stop the others; it is loaded
+        lazily, like any other date, the next time it is requested.
+
+        Resident dates and dates being built are skipped, and no more than 'max_models' dates are
+        loaded. The registry is not locked while the workers run, so requests for resident dates are
+        still served; the dates being loaded count as being built, so requests for them, and
+        country_polarity, wait for the workers instead of building them again.
+
+        Args:
+            dates (list): The dates to load. Defaults to every registered date.
+            workers (int): Number of worker processes, or None for one per CPU.
+
+        Returns:
+            dict: The load time in seconds of each loaded date ('loaded') and the error of each
+                date that failed ('failed').
+        """
+        with self._lock:
+            dates = [
+                date
+                for date in (dates if dates is not None else self.datasets)
+                if date not in self._models and date not in self._building
+            ]
+            if self.max_models is not None:
+                dates = dates[: self.max_models]
+            datasets = {date: self.datasets[date] for date in dates}
+            building = {date: Future() for date in dates}
+            self._building.update(building)
+
+        loaded, failed = {}, {}
+        if not datasets:
+            return {"loaded": loaded, "failed": failed}
+
+        start = time.perf_counter()
+        try:
+            with worker_pool(workers) as executor:
+                futures = {date: executor.submit(build_frame, self.factory, path) for date, path in datasets.items()}
+                for date, future in futures.items():
+                    try:
+                        fingerprint, data, build_time = future.result()
+                        model = self.factory(datasets[date], data=data, fingerprint=fingerprint)
+                    except Exception as error:
+                        print("Could not load {}: {!r}".format(date, error))
+                        failed[date] = error
+                        with self._lock:
+                            self._finish_build(date, building[date])
+                        building[date].set_exception(error)
+                        continue
+
+                    with self._lock:
+                        self._finish_build(date, building[date])
+                        # Skip dates loaded by a request in the meantime, or removed
+                        if date not in self._models and self.datasets.get(date) == datasets[date]:
+                            self.misses += 1
+                            self._add(date, model)
+                            self._evict()
+                    building[date].set_result(model)
+                    loaded[date] = time.perf_counter() - start
+                    print("Loaded {} in {:.2f}s (built in {:.2f}s in a worker)".format(date, loaded[date], build_time))
+        finally:
+            # Release the waiters of the dates the pool never delivered, e.g. if it could not start
+            for date, future in building.items():
+                if not future.done():
+                    with self._lock:
+                        self._finish_build(date, future)
+                    future.set_exception(RuntimeError("Could not load {}".format(date)))
+        return {"loaded": loaded, "failed": failed}
+
+    def country_polarity(self, dates: list = None, workers: int = None) -> dict:
+        """
+        Get the per-country polarity of several dates without making their models resident.
+
+        The aggregates of resident models are read from their country index, and those of the dates
+        being built are read from the models once built. The other dates are built in a pool of worker
+        processes that only send back the aggregates (see build_country_polarity), so nothing is added
+        to the registry and no resident model is evicted. A date that fails is reported and left out.
+
+        Args:
+            dates (list): The dates to aggregate. Defaults to every registered date.
+            workers (int): Number of worker processes, or None for one per CPU.
+
+        Returns:
+            dict: The 'sum', 'count' and 'mean' of the polarity of each country (pd.DataFrame), by date.
+        """
+        aggregates, building, datasets = {}, {}, {}
+        with self._lock:
+            for date in dates if dates is not None else self.datasets:
+                if date in self._models:
+                    aggregates[date] = self._models[date].country_polarity
+                elif date in self._building:
+                    building[date] = self._building[date]
+                else:
+                    datasets[date] = self.datasets[date]
+
+        if datasets:
+            with worker_pool(workers) as executor:
+                futures = {
+                    date: executor.submit(build_country_polarity, self.factory, path) for date, path in datasets.items()
+                }
+                for date, future in futures.items():
+                    try:
+                        aggregates[date] = future.result()
+                    except Exception as error:
+                        print("Could not aggregate {}: {!r}".format(date, error))
+
+        for date, future in building.items():
+            try:
+                aggregates[date] = future.result().country_polarity
+            except Exception as error:
+                print("Could not aggregate {}: {!r}".format(date, error))
+        return aggregates
+
+    def fingerprint(self, date: str) -> str:
+        """
+        Get the fingerprint of the model of a date without loading it (see Model.source_fingerprint).
+
+        Args:
+            date (str): The date of the dataset.
+
+        Returns:
+            str: The fingerprint of the date's model.
+
+        Raises:
+            KeyError: If no dataset is registered for the date.
+        """
+        with self._lock:
+            if date in self._models:
+                return self._models[date].fingerprint
+            path = self.datasets[date]
+        return self.factory.source_fingerprint(path)
+
+    def countries(self, date: str) -> list:
+        """
+        Get the countries of a date without loading its model.
+
+        The countries of a resident model are read from its country index. Otherwise only the
+        'country' column of the dataset is read (see Model.read_countries), once per dataset.
+
+        Args:
+            date (str): The date of the dataset.
+
+        Returns:
+            list: The countries of the date.
+
+        Raises:
+            KeyError: If no dataset is registered for the date.
+        """
+        with self._lock:
+            if date in self._models:
+                return self._models[date].get_all_countries()
+            path = self.datasets[date]
+            if date in self._countries:
+                return list(self._countries[date])
+        countries = self.factory.read_countries(path)
+        with self._lock:
+            if self.datasets.get(date) == path:
+                self._countries[date] = countries
+        return list(countries)
+
+    def add_dataset(self, date: str, path: str) -> None:
+        """
+        Register the dataset of a new date, or replace the dataset of a date. Nothing is loaded.
+
+        Args:
+            date (str): The date of the dataset.
+            path (str): The path of the processed dataset.
+        """
+        with self._lock:
+            self.remove_dataset(date)
+            self.datasets[date] = path
+
+    def remove_dataset(self, date: str) -> None:
+        """
+        Unregister a date, dropping its model if it is resident.
+
+        Args:
+            date (str): The date to remove.
+        """
+        with self._lock:
+            self.datasets.pop(date, None)
+            self._models.pop(date, None)
+            self._sizes.pop(date, None)
+            self._countries.pop(date, None)
+            self._building.pop(date, None)
+
+    def is_loaded(self, date: str) -> bool:
+        """
+        Check whether the model of a date is resident, without loading it.
+        """
+        return date in self._models
+
+    def resident_bytes(self) -> int:
+        """
+        Get the total size in bytes of the resident DataFrames, as measured when they were loaded.
+        """
+        return sum(self._sizes.values())
+
+    def _over_limit(self) -> bool:
+        if self.max_models is not None and len(self._models) > self.max_models:
+            return True
+        return self.max_bytes is not None and self.resident_bytes() > self.max_bytes
+
+    def _evict(self) -> None:
+        while len(self._models) > 1 and self._over_limit():
+            date, _ = self._models.popitem(last=False)
+            del self._sizes[date]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Report the usage of the registry.
+
+        Returns:
+            dict: The hits, misses, evictions, resident dates and resident bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "resident_dates": list(self._models),
+                "resident_bytes": self.resident_bytes(),
+            }
@@ -0,0 +1,123 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+class PolarityTimeSeries:
+    """
+    A country x date matrix of the mean polarity and tweet count of each country.
+
+    Each date's column is filled from the country index of its Model (see Model.build_country_index)
+    when the model loads, and the matrix is kept as NumPy arrays so line-chart queries only slice
+    rows. The aggregates of a date stay in the matrix when its Model is evicted from memory, since
+    they are small and stay valid; they are dropped only when the date itself is removed.
+    The matrix is filled from several threads (model loads and line-chart requests), so every
+    method holds a lock.
+
+    Attributes:
+        dates (list): The dates of the columns, in display order.
+        countries (list): The countries of the rows.
+    """
+
+    def __init__(self, dates: list) -> None:
+        self.dates = list(dates)
+        self.countries = []
+        self._rows = {}
+        self._loaded = set()
+        self._means = np.full((0, len(self.dates)), np.nan)
+        self._counts = np.zeros((0, len(self.dates)), dtype="int64")
+        self._lock = threading.RLock()
+
+    def register_date(self, date: str) -> int:
+        """
+        Add an empty column for a date if it has none.
+
+        Args:
+            date (str): The date of the column.
+
+        Returns:
+            int: The position of the date's column.
+        """
+        with self._lock:
+            if date not in self.dates:
+                self.dates.append(date)
+                self._means = np.hstack([self._means, np.full((len(self.countries), 1), np.nan)])
+                self._counts = np.hstack([self._counts, np.zeros((len(self.countries), 1), dtype="int64")])
+            return self.dates.index(date)
+
+    def add_date(self, date: str, country_polarity: pd.DataFrame) -> None:
+        """
+        Fill (or refill) the column of a date.
+
+        Args:
+            date (str): The date of the column. Unknown dates are appended.
+            country_polarity (pd.DataFrame): The 'mean' and 'count' of the polarity, indexed by country.
+        """
+        with self._lock:
+            column = self.register_date(date)
+            new_countries = [country for country in country_polarity.index if country not in self._rows]
+            if new_countries:
+                self._rows.update({country: len(self.countries) + i for i, country in enumerate(new_countries)})
+                self.countries.extend(new_countries)
+                self._means = np.vstack([self._means, np.full((len(new_countries), len(self.dates)), np.nan)])
+                self._counts = np.vstack([self._counts, np.zeros((len(new_countries), len(self.dates)), dtype="int64")])
+
+            rows = [self._rows[country] for country in country_polarity.index]
+            self._means[:, column] = np.nan
+            self._counts[:, column] = 0
+            self._means[rows, column] = country_polarity["mean"].to_numpy(dtype="float64")
+            self._counts[rows, column] = country_polarity["count"].to_numpy(dtype="int64")
+            self._loaded.add(date)
+
+    def remove_date(self, date: str) -> None:
+        """
+        Drop the column of a date.
+
+        Args:
+            date (str): The date to remove.
+        """
+        with self._lock:
+            if date not in self.dates:
+                return
+            column = self.dates.index(date)
+            del self.dates[column]
+            self._means = np.delete(self._means, column, axis=1)
+            self._counts = np.delete(self._counts, column, axis=1)
+            self._loaded.discard(date)
+
+    def missing_dates(self) -> list:
+        """
+        Get the dates whose column has not been filled yet.
+        """
+        with self._lock:
+            return [date for date in self.dates if date not in self._loaded]
+
+    def get(self, countries: list) -> pd.DataFrame:
+        """
+        Get the polarity time series of one or several countries.
+
+        A country without tweets on a date gets a polarity of 0 and a count of 0.
+
+        Args:
+            countries (list): The countries to return.
+
+        Returns:
+            pd.DataFrame: One row per (country, date), with 'Date', 'Country', 'Polarity' and 'Count' columns.
+        """
+        with self._lock:
+            means = np.zeros((len(countries), len(self.dates)))
+            counts = np.zeros((len(countries), len(self.dates)), dtype="int64")
+            for i, country in enumerate(countries):
+                row = self._rows.get(country)
+                if row is not None:
+                    means[i] = np.nan_to_num(self._means[row])
+                    counts[i] = self._counts[row]
+
+            return pd.DataFrame(
+                {
+                    "Date": np.tile(self.dates, len(countries)),
+                    "Country": np.repeat(countries, len(self.dates)),
+                    "Polarity": means.ravel(),
+                    "Count": counts.ravel(),
+                }
+            )
@@ -0,0 +1,97 @@
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+from matplotlib.colors import ListedColormap
+from wordcloud import STOPWORDS, ImageColorGenerator
+from spacy.lang.es.stop_words import STOP_WORDS as es_stopwords
+
+
+# Words left out of the words wordcloud on top of the WordCloud stopwords and the Spanish stopwords
+EXTRA_STOPWORDS = ("https", "t", "co", "will")
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    # The assets are shared between renders, so they must never be modified in place
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=None)
+def mask_image(path: str, scale: float = 1.0) -> Image.Image:
+    """
+    Open a mask image, downscaled by a factor.
+
+    Nearest-neighbour resampling is used so the downscaled mask keeps only the colors of the original
+    one, which keeps the white (masked out) areas exactly white.
+
+    Args:
+        path (str): The path of the image.
+        scale (float): The downscaling factor, 1.0 for the original size.
+
+    Returns:
+        PIL.Image.Image: The RGBA image.
+    """
+    image = Image.open(path).convert("RGBA")
+    if scale != 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.NEAREST)
+    return image
+
+
+@lru_cache(maxsize=None)
+def load_mask(path: str, scale: float = 1.0) -> np.ndarray:
+    """
+    Load a mask image composited onto a white background, as a read-only array.
+
+    The size of the mask sets the size of the wordcloud, so a downscaled mask gives a proportionally
+    cheaper render.
+
+    Args:
+        path (str): The path of the image.
+        scale (float): The downscaling factor, 1.0 for the original size.
+
+    Returns:
+        np.ndarray: The RGBA pixels of the mask.
+    """
+    mask = mask_image(path, scale)
+    white_bg = Image.new("RGBA", mask.size, "WHITE")
+    white_bg.paste(mask, (0, 0), mask)
+    return _read_only(np.array(white_bg))
+
+
+@lru_cache(maxsize=None)
+def mask_colors(path: str, scale: float = 1.0) -> ImageColorGenerator:
+    """
+    Build a color generator that colors the words with the colors of a mask image.
+
+    Args:
+        path (str): The path of the image.
+        scale (float): The downscaling factor, which must match the one of the mask used for the render.
+
+    Returns:
+        wordcloud.ImageColorGenerator: The color generator.
+    """
+    return ImageColorGenerator(_read_only(np.array(mask_image(path, scale))))
+
+
+@lru_cache(maxsize=None)
+def colormap(colors: tuple) -> ListedColormap:
+    """
+    Build a colormap cycling through a list of colors.
+
+    Args:
+        colors (tuple): The names of the colors.
+
+    Returns:
+        matplotlib.colors.ListedColormap: The colormap.
+    """
+    return ListedColormap(list(colors))
+
+
+@lru_cache(maxsize=None)
+def wordcloud_stopwords() -> frozenset:
+    """
+    Get the stopwords of the words wordcloud: the WordCloud (English) stopwords, the spaCy Spanish
+    stopwords and EXTRA_STOPWORDS.
+    """
+    return frozenset(STOPWORDS) | frozenset(es_stopwords) | frozenset(EXTRA_STOPWORDS)
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """
+    A content-addressed cache of rendered images, with an in-memory tier and an on-disk tier.
+
+    Entries are keyed by a hash of everything that determines the image (see key()), so an entry never
+    needs to be invalidated: when the data or the parameters change, the key changes. The memory tier is
+    an LRU bounded in bytes. The disk tier survives restarts and is bounded in bytes as well, evicting
+    the least recently used files first.
+
+    Attributes:
+        directory (str): The directory of the disk tier, or None to keep the cache in memory only.
+        max_memory_bytes (int): Maximum size of the memory tier.
+        max_disk_bytes (int): Maximum size of the disk tier.
+        memory_hits (int): Number of lookups served from memory.
+        disk_hits (int): Number of lookups served from disk.
+        misses (int): Number of lookups that had to render the image.
+    """
+
+    def __init__(
+        self, directory: str = "data/render_cache", max_memory_bytes: int = 64 << 20, max_disk_bytes: int = 512 << 20
+    ) -> None:
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts) -> str:
+        """
+        Build the key of an entry from everything that determines its content.
+
+        Args:
+            *parts: JSON-serializable values, e.g. the date, the image type, the data fingerprint
+                and the render parameters.
+
+        Returns:
+            str: The hexadecimal key.
+        """
+        encoded = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".bin")
+
+    def _remember(self, key: str, value: bytes) -> None:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = value
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key: str) -> bytes:
+        """
+        Look an entry up, in memory first and then on disk.
+
+        Args:
+            key (str): The key of the entry.
+
+        Returns:
+            bytes or None: The cached content, or None if it is not cached.
+        """
+        with self._lock:
+            if key in self._memory:
+                self.memory_hits += 1
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            if self.directory is not None:
+                try:
+                    with open(self._path(key), "rb") as file:
+                        value = file.read()
+                except OSError:
+                    value = None
+                if value is not None:
+                    # Refresh the modification time, which orders the disk evictions
+                    os.utime(self._path(key))
+                    self.disk_hits += 1
+                    self._remember(key, value)
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Store an entry in both tiers.
+
+        Args:
+            key (str): The key of the entry.
+            value (bytes): The content to cache.
+        """
+        with self._lock:
+            self._remember(key, value)
+            if self.directory is None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            # A unique temporary name, since other processes may store the same entry at once
+            descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix=key + ".", suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as file:
+                    file.write(value)
+                os.replace(temporary_path, self._path(key))
+            except BaseException:
+                os.remove(temporary_path)
+                raise
+            self._evict_disk()
+
+    def get_or_render(self, key: str, render) -> bytes:
+        """
+        Get an entry, rendering and storing it if it is not cached.
+
+        Args:
+            key (str): The key of the entry.
+            render (callable): Called without arguments to produce the content on a miss.
+
+        Returns:
+            bytes: The content.
+        """
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def _disk_entries(self) -> list:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Evicted by another process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict_disk(self) -> None:
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        """
+        Report the usage of the cache.
+
+        Returns:
+            dict: The memory hits, disk hits, misses, hit rate and the size of each tier in bytes.
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_bytes = 0
+            if self.directory is not None and os.path.isdir(self.directory):
+                disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": disk_bytes,
+            }
@@ -0,0 +1,136 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from textblob import TextBlob
+from textblob.en import sentiment as pattern_lexicon
+
+
+def polarity_chunk(texts: list) -> list:
+    """
+    Compute the TextBlob polarity of every text of a chunk.
+
+    This is a module-level function so it can be sent to worker processes.
+
+    Args:
+        texts (list): The texts to analyse.
+
+    Returns:
+        list: The polarity of each text, in the same order.
+    """
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+class SentimentEngine:
+    """
+    Computes the TextBlob polarity of a whole column of tweets.
+
+    Each distinct text is analysed only once, and the distinct texts are split into chunks that are
+    analysed in parallel by a pool of worker processes. The results are identical to calling
+    TextBlob(text).sentiment.polarity on every row.
+
+    Attributes:
+        workers (int): Number of worker processes. 1 runs everything in the current process.
+        chunk_size (int): Number of distinct texts sent to a worker at once.
+    """
+
+    def __init__(self, workers: int = None, chunk_size: int = 2000) -> None:
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+
+    def _score(self, texts: list) -> list:
+        if self.workers <= 1 or len(texts) <= self.chunk_size:
+            return polarity_chunk(texts)
+
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        scores = []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for chunk_scores in executor.map(polarity_chunk, chunks):
+                scores.extend(chunk_scores)
+        return scores
+
+    def polarities(self, texts: pd.Series) -> pd.Series:
+        """
+        Compute the polarity of every text of a column.
+
+        Missing texts get a polarity of 0, like Model.polarity.
+
+        Args:
+            texts (pd.Series): The texts to analyse.
+
+        Returns:
+            pd.Series: The polarity of each text, aligned with the input.
+        """
+        codes, uniques = pd.factorize(texts)
+        scores = np.append(np.asarray(self._score(list(uniques)), dtype="float64"), 0.0)
+        # Missing values have the code -1, which picks the trailing 0
+        return pd.Series(scores[codes], index=texts.index, name="polarity")
+
+
+# Negation words, rewritten as a 'not_' prefix on the following word ("not good" -> "not_good").
+# Like TextBlob, contractions such as "isn't" are not treated as negations.
+NEGATION = re.compile(r"\b(?:not|no|never)\s+(?=\w)")
+TOKEN_PATTERN = r"(?u)\b\w+\b"
+
+
+@lru_cache(maxsize=None)
+def compiled_lexicon() -> tuple:
+    """
+    Compile the TextBlob (pattern) sentiment lexicon into a vocabulary and a weight vector.
+
+    Each single-word entry gets its polarity averaged over parts of speech, as TextBlob does, and a
+    'not_' entry with the polarity TextBlob gives to a negated word (-0.5 times the polarity).
+    Adverbs are left out because TextBlob uses them to scale the next word rather than scoring them,
+    and so are multi-word and contracted entries, which TextBlob's tokenizer never matches.
+    The result is computed once per process.
+
+    Returns:
+        tuple: The vocabulary (dict mapping a token to its column) and the weights (np.ndarray).
+    """
+    pattern_lexicon.load()
+    words = {}
+    for word, scores in pattern_lexicon.items():
+        if "RB" in scores or not re.fullmatch(r"\w+", word):
+            continue
+        polarity = scores[None][0]
+        words[word] = polarity
+        words["not_" + word] = -0.5 * polarity
+    vocabulary = {word: column for column, word in enumerate(words)}
+    return vocabulary, np.fromiter(words.values(), dtype="float64", count=len(words))
+
+
+class LexiconSentimentScorer:
+    """
+    Approximates the TextBlob polarity of a whole column of tweets with sparse linear algebra.
+
+    The column is tokenized once into a sparse document-term matrix over the words of the TextBlob
+    lexicon. The polarity of every tweet is then the mean weight of its lexicon words, obtained with
+    one matrix-vector product. Negations are handled, intensity modifiers and punctuation are not,
+    so the values are close to but not identical to TextBlob's.
+    """
+
+    def __init__(self) -> None:
+        vocabulary, self.weights = compiled_lexicon()
+        self.vectorizer = CountVectorizer(vocabulary=vocabulary, token_pattern=TOKEN_PATTERN, lowercase=False)
+
+    def polarities(self, texts: pd.Series) -> pd.Series:
+        """
+        Compute the approximate polarity of every text of a column.
+
+        Missing texts get a polarity of 0, like Model.polarity.
+
+        Args:
+            texts (pd.Series): The texts to analyse.
+
+        Returns:
+            pd.Series: The polarity of each text, aligned with the input.
+        """
+        normalized = texts.fillna("").astype(str).str.lower().str.replace(NEGATION, "not_", regex=True)
+        matrix = self.vectorizer.transform(normalized)
+        totals = matrix @ self.weights
+        counts = np.asarray(matrix.sum(axis=1)).ravel()
+        scores = np.clip(totals / np.maximum(counts, 1), -1.0, 1.0)
+        return pd.Series(scores, index=texts.index, name="polarity")
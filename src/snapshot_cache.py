@@ -0,0 +1,139 @@
+import glob
+import hashlib
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.columnar_io import read_parquet
+
+
+class SnapshotCache:
+    """
+    An on-disk cache of fully derived Model DataFrames.
+
+    A snapshot is stored as a Parquet file named after its source file and a key. The key combines
+    a hash of the source file contents with a fingerprint of the code that derives the columns, so a
+    snapshot is ignored (and replaced) as soon as either of them changes.
+
+    Attributes:
+        directory (str): The directory holding the snapshot files.
+    """
+
+    # Hash of each file, by path, size and modification time
+    _file_hashes = {}
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """
+        Compute the SHA-256 hash of a file, reading it in blocks.
+
+        The hash is memoized by path, size and modification time, so an unchanged file is only read once
+        per process.
+
+        Args:
+            path (str): The file to hash.
+
+        Returns:
+            str: The hexadecimal digest of the file contents.
+        """
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in SnapshotCache._file_hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
+            SnapshotCache._file_hashes[memo_key] = digest.hexdigest()
+        return SnapshotCache._file_hashes[memo_key]
+
+    @staticmethod
+    def key(source: str, fingerprint: str) -> str:
+        """
+        Build the snapshot key of a source file.
+
+        The key identifies the derived data itself, so it also serves as a fingerprint of the data.
+
+        Args:
+            source (str): The path of the source dataset.
+            fingerprint (str): The fingerprint of the derivation code and its options.
+
+        Returns:
+            str: The snapshot key.
+        """
+        digest = hashlib.sha256()
+        digest.update(SnapshotCache.file_hash(source).encode())
+        digest.update(fingerprint.encode())
+        return digest.hexdigest()[:32]
+
+    def _prefix(self, source: str) -> str:
+        return os.path.join(self.directory, os.path.splitext(os.path.basename(source))[0])
+
+    def path(self, source: str, key: str) -> str:
+        """
+        Get the path of the snapshot of a source file for a given key.
+        """
+        return "{}-{}.parquet".format(self._prefix(source), key)
+
+    def load(self, source: str, key: str) -> pd.DataFrame:
+        """
+        Load the snapshot of a source file.
+
+        Args:
+            source (str): The path of the source dataset.
+            key (str): The snapshot key, as returned by key().
+
+        Returns:
+            pd.DataFrame or None: The derived DataFrame, or None if there is no valid snapshot.
+        """
+        path = self.path(source, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return read_parquet(path)
+        except (OSError, pa.ArrowException):
+            # A corrupted snapshot is simply rebuilt
+            return None
+
+    def save(self, source: str, key: str, data: pd.DataFrame) -> None:
+        """
+        Write the snapshot of a source file and remove its outdated snapshots.
+
+        The file is written under a temporary name and then renamed, so a crash never leaves a
+        partial snapshot behind. The temporary name is unique, so several processes can save the
+        snapshot of the same source at once. Frames that cannot be converted to Arrow are not cached.
+
+        Args:
+            source (str): The path of the source dataset.
+            key (str): The snapshot key, as returned by key().
+            data (pd.DataFrame): The derived DataFrame.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(source, key)
+        try:
+            table = pa.Table.from_pandas(data, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            print("Could not write snapshot for {}: {}".format(source, e))
+            return
+
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+        )
+        os.close(descriptor)
+        try:
+            pq.write_table(table, temporary_path)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        for outdated in glob.glob(glob.escape(self._prefix(source)) + "-" + "?" * len(key) + ".parquet"):
+            if outdated != path:
+                try:
+                    os.remove(outdated)
+                except FileNotFoundError:
+                    # Removed by another process saving the same source
+                    pass
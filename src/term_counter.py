@@ -0,0 +1,86 @@
+import re
+from collections import Counter, defaultdict
+
+
+# Same tokenization as WordCloud.process_text
+TOKEN = re.compile(r"\w[\w']*")
+
+
+def count_terms(texts, stopwords: set, normalize_plurals: bool = True) -> dict:
+    """
+    Count the words of a stream of texts, for WordCloud.generate_from_frequencies.
+
+    The texts are tokenized one at a time into a single counter, so memory grows with the
+    vocabulary and not with the total size of the text. The cleaning then runs once over the
+    vocabulary, following WordCloud.process_text: the "'s" suffix and numbers are removed,
+    stopwords are dropped case-insensitively, plurals are merged into their singular when it
+    also occurs, and the case variants of a word are merged under the most frequent one.
+    Unlike WordCloud.generate, no bigrams (collocations) are added.
+
+    Args:
+        texts (iterable): The texts to count.
+        stopwords (set): The words to leave out.
+        normalize_plurals (bool): Whether to merge plurals into their singular.
+
+    Returns:
+        dict: The number of occurrences of each word.
+    """
+    counts = Counter()
+    for text in texts:
+        counts.update(TOKEN.findall(text))
+    return clean_counts(counts, stopwords, normalize_plurals)
+
+
+def count_weighted_terms(frequencies: dict, stopwords: set, normalize_plurals: bool = True) -> dict:
+    """
+    Count the words of texts given with their number of occurrences, such as the hashtag frequencies
+    of a model, for WordCloud.generate_from_frequencies.
+
+    Each distinct text is tokenized once and its words are counted as many times as the text occurs,
+    then the vocabulary is cleaned as in count_terms.
+
+    Args:
+        frequencies (dict): The number of occurrences of each text.
+        stopwords (set): The words to leave out.
+        normalize_plurals (bool): Whether to merge plurals into their singular.
+
+    Returns:
+        dict: The number of occurrences of each word.
+    """
+    counts = Counter()
+    for text, count in frequencies.items():
+        for word in TOKEN.findall(text):
+            counts[word] += count
+    return clean_counts(counts, stopwords, normalize_plurals)
+
+
+def clean_counts(counts: Counter, stopwords: set, normalize_plurals: bool = True) -> dict:
+    """
+    Clean the word counts of a vocabulary the way WordCloud.process_text does (see count_terms).
+
+    Args:
+        counts (Counter): The number of occurrences of each token.
+        stopwords (set): The words to leave out.
+        normalize_plurals (bool): Whether to merge plurals into their singular.
+
+    Returns:
+        dict: The number of occurrences of each word.
+    """
+
+    stopwords = {word.lower() for word in stopwords}
+    # Count of each case variant, grouped by lowercase word
+    cases = defaultdict(Counter)
+    for word, count in counts.items():
+        if word.lower().endswith("'s"):
+            word = word[:-2]
+        if not word or word.isdigit() or word.lower() in stopwords:
+            continue
+        cases[word.lower()][word] += count
+
+    if normalize_plurals:
+        for word in list(cases):
+            if word.endswith("s") and not word.endswith("ss") and word[:-1] in cases:
+                for variant, count in cases.pop(word).items():
+                    cases[word[:-1]][variant[:-1]] += count
+
+    return {variants.most_common(1)[0][0]: sum(variants.values()) for variants in cases.values()}
@@ -0,0 +1,107 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dash.long_callback.managers import BaseLongCallbackManager
+from dash.long_callback.managers.diskcache_manager import _make_job_fn
+
+
+class ResultStore:
+    """
+    A thread-safe in-memory store of background callback results and progress, with the part of
+    the diskcache.Cache interface the Dash job functions use.
+    """
+
+    def __init__(self) -> None:
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class ThreadCallbackManager(BaseLongCallbackManager):
+    """
+    A Dash background callback manager that runs the jobs on a pool of threads of the server process.
+
+    DiskcacheManager forks a process per job. Forking the multithreaded dashboard server can copy a
+    lock held by another thread (such as a model build in the ModelRegistry) into the child, where it
+    is never released, and whatever the job loads or caches is lost with the child. The jobs here run
+    next to the request threads instead: the request that starts a job returns right away, and the
+    models and figures a job builds stay in the server's registry and caches. Jobs and results live
+    in memory, so the dashboard must be served by a single process.
+
+    A thread cannot be killed, so terminating a job only cancels it if it has not started yet; a
+    running job finishes and its result is dropped when it is read or replaced.
+
+    Attributes:
+        workers (int): Number of job threads.
+    """
+
+    def __init__(self, workers: int = 2) -> None:
+        self.workers = workers
+        self.handle = ResultStore()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="background-callback")
+        self._jobs = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        super().__init__(None)
+
+    def make_job_fn(self, fn, progress, key=None):
+        return _make_job_fn(fn, self.handle, progress)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job = str(next(self._job_ids))
+        with self._lock:
+            self._jobs[job] = (key, self._executor.submit(job_fn, key, self._make_progress_key(key), args, context))
+        return job
+
+    def job_running(self, job):
+        with self._lock:
+            key, future = self._jobs.get(str(job), (None, None))
+        # A finished job counts as running until its result is read, so it is not taken for cancelled
+        return future is not None and (not future.done() or self.result_ready(key))
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        with self._lock:
+            _, future = self._jobs.pop(str(job), (None, None))
+        if future is not None:
+            future.cancel()
+
+    def terminate_unhealthy_job(self, job):
+        # Threads do not outlive their job, unlike the processes of DiskcacheManager
+        return False
+
+    def clear_cache_entry(self, key):
+        self.handle.delete(key)
+
+    def get_progress(self, key):
+        progress_key = self._make_progress_key(key)
+        progress_data = self.handle.get(progress_key)
+        if progress_data:
+            self.handle.delete(progress_key)
+        return progress_data
+
+    def result_ready(self, key):
+        return self.handle.get(key) is not None
+
+    def get_result(self, key, job):
+        result = self.handle.get(key, self.UNDEFINED)
+        if result is self.UNDEFINED:
+            return self.UNDEFINED
+
+        self.clear_cache_entry(key)
+        self.clear_cache_entry(self._make_progress_key(key))
+        if job:
+            self.terminate_job(job)
+        return result
@@ -1,4 +1,5 @@
 import dash
+from flask import Response, abort, redirect, request
 from dash import html, dcc, Input, Output
 import plotly.graph_objects as go
 import plotly.express as px
@@ -9,8 +10,10 @@ import numpy as np
 from io import BytesIO
 from src.controller import Controller
 from src.header import Header
-from src.visualizor import Visualizor
+from src.visualizor import Visualizor, SWITCH_CHOROPLETH_STANCE
 from src.dropdown_creator import DropdownCreator
+from src.warmup_scheduler import WarmupScheduler
+from src.thread_callback_manager import ThreadCallbackManager
 # Loading the database from the 'Model' class
 
 
@@ -21,17 +24,40 @@ body_style = {
 }
 
 
+# Style of the graphs: dimmed while a background callback is updating them
+loading_style = {"opacity": 0.4, "transition": "opacity 0.2s"}
+
+# Number of threads running the background callbacks
+BACKGROUND_CALLBACK_WORKERS = 2
+
+# Maximum number of date models, and of bytes of their DataFrames, kept in memory by the dashboard
+MAX_RESIDENT_MODELS = 4
+MAX_RESIDENT_BYTES = 1 << 30
+
+# Cache-Control of the wordcloud images: their URL changes whenever the image does
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
 external_stylesheets = [
     "https://fonts.googleapis.com/css2?family=Open+Sans:wght@400;700&display=swap"
 ]
 
     
 class View:
-    def __init__(self) -> None:
-        self.app = dash.Dash(__name__)
-        self.controller = Controller()
+    def __init__(
+        self, warmup: bool = True, max_models: int = MAX_RESIDENT_MODELS, max_bytes: int = MAX_RESIDENT_BYTES
+    ) -> None:
+        # Slow callbacks run as background jobs on threads of the server, so they do not hold a request
+        self.background_callback_manager = ThreadCallbackManager(BACKGROUND_CALLBACK_WORKERS)
+        self.app = dash.Dash(__name__, background_callback_manager=self.background_callback_manager)
+        self.controller = Controller(max_models=max_models, max_bytes=max_bytes)
+        # Precompute the dashboard artifacts in the background, defaults first
+        self.warmup = WarmupScheduler(self.controller)
+        if warmup:
+            self.warmup.start()
         self.setup_layout()
         self.setup_callbacks()
+        self.setup_routes()
 
     def run(self):
         self.app.run_server(debug=False)
@@ -44,7 +70,8 @@ class View:
                     DropdownCreator().create_date_dropdown(self.controller.get_dates()),
                     html.Div([
                         DropdownCreator().create_choropleth_option_dropdown(),
-                        html.Div(id='choropleth-div')
+                        dcc.Store(id='choropleth-store'),
+                        dcc.Loading(html.Div(dcc.Graph(id='choropleth-map'), id='choropleth-div'))
                     ]),
                     html.Div([
                         DropdownCreator().create_bar_chart_dropdown(),
@@ -52,7 +79,7 @@ class View:
                     ]),
                     html.Div([
                         DropdownCreator().create_wordcloud_dropdown('wordcloud-dropdown'),
-                        html.Img(id='wordcloud', style={'width': '100%', 'height': 'auto'})
+                        dcc.Loading(html.Img(id='wordcloud', style={'width': '100%', 'height': 'auto'}))
                     ]),
                 ]),
                 html.Div([
@@ -67,25 +94,37 @@ class View:
         Set up the Dash callbacks for interactive updates.
 
         Includes callbacks for updating choropleth map, bar chart, wordcloud, and line chart.
+        The data of the choropleth map needs the date's model, which may have to be built, so it runs
+        as a background callback on a thread of the server (see ThreadCallbackManager) and the map is
+        dimmed while it updates. The data holds both stances of the date, so switching the stance is
+        done in the browser by a clientside callback. The wordcloud callback only returns the URL of
+        the image (see setup_routes), and the bar chart and the line chart stay synchronous.
         """
         @self.app.callback(
-            Output('choropleth-div', 'children'),
-            [Input('date-dropdown', 'value'), Input('choropleth-option-dropdown', 'value')]
+            Output('choropleth-store', 'data'),
+            [Input('date-dropdown', 'value')],
+            background=True,
+            running=[(Output('choropleth-div', 'style'), loading_style, {})],
         )
-        def update_choropleth(selected_date, selected_option):
+        def update_choropleth(selected_date):
             """
-            Update the choropleth map based on user-selected date and choropleth option.
+            Update the choropleth data based on user-selected date.
 
             Parameters:
             - selected_date (str): The selected date from the date dropdown.
-            - selected_option (str): The selected choropleth option from the dropdown.
 
             Returns:
-            - dcc.Graph: Dash component representing the updated choropleth map.
+            - dict: The base figure of the choropleth map and the values and colors of both stances.
             """
-            print(selected_date, selected_option)
-            figure = Visualizor().create_choropleth_map(self.controller.get_choropleth_data(selected_date, selected_option))
-            return figure
+            print(selected_date)
+            return Visualizor().create_choropleth_store(self.controller.get_choropleth_stances(selected_date))
+
+        # Show the selected stance of the choropleth map, in the browser
+        self.app.clientside_callback(
+            SWITCH_CHOROPLETH_STANCE,
+            Output('choropleth-map', 'figure'),
+            [Input('choropleth-store', 'data'), Input('choropleth-option-dropdown', 'value')]
+        )
 
         @self.app.callback(
             Output('barchart-div', 'children'),
@@ -122,16 +161,10 @@ class View:
             Returns:
             - str: The source URL of the wordcloud image to be displayed.
             """
-            wordcloud_image = None
-
-            # Check the selected wordcloud type and generate the corresponding wordcloud image
-            if selected_option == 'wordcloud1':
-                wordcloud_image = self.controller.generate_wordcloud(selected_date)
-            elif selected_option == 'wordcloud2':
-                wordcloud_image = self.controller.generate_classical_wordcloud(selected_date)
-
-            # Return the generated wordcloud image source URL
-            return wordcloud_image
+            # The image itself is rendered and served by the wordcloud route
+            if selected_option not in ('wordcloud1', 'wordcloud2'):
+                return None
+            return self.controller.wordcloud_url(selected_date, selected_option)
 
         @self.app.callback(
         Output('div-line-chart', 'children'),
@@ -142,6 +175,35 @@ class View:
             figure = Visualizor().create_line_chart(data)
             return figure
 
+    def setup_routes(self):
+        """
+        Set up the HTTP routes served next to the Dash app.
+
+        '/wordcloud/<type>.png?date=<date>&v=<version>' serves the PNG image of a wordcloud. The version is
+        the render cache key of the image (see Controller.wordcloud_url), which is also sent as a strong
+        ETag: a request with a matching If-None-Match gets a 304 without rendering anything, and the
+        image is marked immutable so browsers do not ask again. A request with an outdated version is
+        redirected to the current URL. The key is computed without loading the date's model (see
+        Controller.wordcloud_key), so only a 200 response may load it.
+        """
+        @self.app.server.route('/wordcloud/<kind>.png')
+        def wordcloud_png(kind):
+            selected_date = request.args.get('date')
+            if selected_date not in self.controller.get_dates() or kind not in ('wordcloud1', 'wordcloud2'):
+                abort(404)
+
+            key = self.controller.wordcloud_key(selected_date, kind)
+            if request.args.get('v') != key:
+                return redirect(self.controller.wordcloud_url(selected_date, kind))
+
+            if request.if_none_match.contains(key):
+                response = Response(status=304)
+            else:
+                response = Response(self.controller.get_wordcloud_png(selected_date, kind), mimetype='image/png')
+            response.set_etag(key)
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            return response
+
 
 
 if __name__ == "__main__":
@@ -1,9 +1,45 @@
+import threading
 from dash import dcc
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.colors import get_colorscale
+from src.figure_cache import FigureCache
+
+# Plotly Express is not thread-safe (concurrent calls share the default template), so the
+# figures of concurrent requests are built one at a time
+plotly_express_lock = threading.Lock()
+
+# Colorscale and colorbar title of the choropleth map for each option of the stance dropdown
+CHOROPLETH_STANCES = {
+    "option1": {"colorscale": "Reds", "colorbar_title": "Number of pro-russian tweets"},
+    "option2": {"colorscale": "Blues", "colorbar_title": "Number of pro-ukrainian tweets"},
+}
+
+# Replaces the values, hover texts, colorscale and colorbar title of the choropleth map in the browser,
+# from the stances of a date held in the 'choropleth-store' (see Visualizor.create_choropleth_store)
+SWITCH_CHOROPLETH_STANCE = """
+function(store, option) {
+    if (!store) {
+        return window.dash_clientside.no_update;
+    }
+    const stance = store.stances[option] || store.stances[store.default];
+    const figure = {...store.figure, data: [...store.figure.data]};
+    figure.data[0] = {
+        ...figure.data[0],
+        z: stance.z,
+        text: stance.text,
+        colorscale: stance.colorscale,
+        colorbar: {...figure.data[0].colorbar, title: {text: stance.colorbar_title}},
+    };
+    return figure;
+}
+"""
 
 class Visualizor:
-    def create_choropleth_map(self, data):
+    # Serialized figures, shared by every Visualizor so each one is built once per distinct input
+    figure_cache = FigureCache()
+
+    def create_choropleth_map(self, data, option="option1"):
         """
         Create a choropleth map based on the provided data.
 
@@ -12,46 +48,109 @@ class Visualizor:
             - loc (list): List of location codes.
             - position (list): List of values corresponding to the locations.
             - countries (list): List of country names.
+        - option (str): The stance option of the values, which sets the colors (see CHOROPLETH_STANCES).
 
         Returns:
         - dcc.Graph: Dash component representing the choropleth map.
         """
-        loc, position, countries = data
-
-        # Create a Plotly figure for the choropleth map
-        fig = go.Figure(
-            data=go.Choropleth(
-                locations=loc,  
-                z=position,  
-                locationmode="ISO-3", 
-                colorscale="Reds",
-                autocolorscale=False,
-                text=[f"{country}: {value}" for country, value in zip(countries, position)], 
-                marker_line_color="white",
-                colorbar_title="Number of pro-russian tweets",
+        return dcc.Graph(id='choropleth-map', figure=self.choropleth_figure(data, option))
+
+    def choropleth_figure(self, data, option="option1"):
+        """
+        Build the figure of a choropleth map, as a dict.
+
+        The figure is served from the figure cache when it was already built for the same data. It is
+        shared with the other users of the cache and must not be modified.
+
+        Parameters:
+        - data (tuple): The location codes, values and country names (see create_choropleth_map).
+        - option (str): The stance option of the values.
+
+        Returns:
+        - dict: The plotly figure.
+        """
+        stance = CHOROPLETH_STANCES[option]
+
+        def build():
+            loc, position, countries = data
+
+            # Create a Plotly figure for the choropleth map
+            fig = go.Figure(
+                data=go.Choropleth(
+                    locations=loc,  
+                    z=position,  
+                    locationmode="ISO-3", 
+                    colorscale=stance["colorscale"],
+                    autocolorscale=False,
+                    text=[f"{country}: {value}" for country, value in zip(countries, position)], 
+                    marker_line_color="white",
+                    colorbar_title=stance["colorbar_title"],
+                )
             )
-        )
-
-        # Update the layout of the figure for better presentation
-        fig.update_layout(
-            margin={"r": 0, "t": 0, "l": 0, "b": 0},  # Reduce margins to use more space
-            geo=dict(
-                projection_scale=5,  # Adjust scale of the map
-                center=dict(lat=0, lon=0),  # Adjust center
+
+            # Update the layout of the figure for better presentation
+            fig.update_layout(
+                margin={"r": 0, "t": 0, "l": 0, "b": 0},  # Reduce margins to use more space
+                geo=dict(
+                    projection_scale=5,  # Adjust scale of the map
+                    center=dict(lat=0, lon=0),  # Adjust center
+                )
             )
-        )
+            return fig
 
-        # Return the choropleth map as a Dash Graph component
-        return dcc.Graph(id='choropleth-map', figure=fig)
+        return self.figure_cache.get_or_build("choropleth", (option, data), build)
+
+    def create_choropleth_store(self, stances):
+        """
+        Build the content of the 'choropleth-store' of a date: the figure of the default stance, and
+        the values, hover texts and colors of every stance, so the stance dropdown is switched in the
+        browser by SWITCH_CHOROPLETH_STANCE without calling the server. The store is served from the
+        figure cache when it was already built for the same stances.
+
+        Parameters:
+        - stances (dict): The 'locations' and 'countries' of the map, and the values of each stance
+          option (see Controller.get_choropleth_stances).
+
+        Returns:
+        - dict: The base 'figure', the 'default' option and the 'stances' of each option.
+        """
+        def build():
+            default = next(iter(CHOROPLETH_STANCES))
+            data = (stances["locations"], stances[default], stances["countries"])
+            return {
+                "figure": self.choropleth_figure(data, default),
+                "default": default,
+                "stances": {
+                    option: {
+                        "z": stances[option],
+                        "text": [f"{country}: {value}" for country, value in zip(stances["countries"], stances[option])],
+                        "colorscale": get_colorscale(stance["colorscale"]),
+                        "colorbar_title": stance["colorbar_title"],
+                    }
+                    for option, stance in CHOROPLETH_STANCES.items()
+                },
+            }
+
+        return self.figure_cache.get_or_build("choropleth-store", stances, build)
 
 
     def create_bar_chart(self, data):
-        fig = px.bar(data, x='username', y='count')
-        fig.update_layout(
-            margin={"r": 0, "t": 0, "l": 0, "b": 0},  # Reduce margins to use more space
-        )
-        return dcc.Graph(id='bar-chart', figure=fig)
+        def build():
+            with plotly_express_lock:
+                fig = px.bar(data, x='username', y='count')
+            fig.update_layout(
+                margin={"r": 0, "t": 0, "l": 0, "b": 0},  # Reduce margins to use more space
+            )
+            return fig
+
+        return dcc.Graph(id='bar-chart', figure=self.figure_cache.get_or_build("bar", data, build))
         
     def create_line_chart(self, data):
-        fig = px.line(data, x="Date", y="Polarity", title='Polarity over time', markers=True)
-        return dcc.Graph(id='line-chart', figure=fig)
\ No newline at end of file
+        def build():
+            # Several countries are overlaid with one line each
+            color = "Country" if "Country" in data and data["Country"].nunique() > 1 else None
+            with plotly_express_lock:
+                fig = px.line(data, x="Date", y="Polarity", color=color, title='Polarity over time', markers=True)
+            return fig
+
+        return dcc.Graph(id='line-chart', figure=self.figure_cache.get_or_build("line", data, build))
\ No newline at end of file
@@ -0,0 +1,220 @@
+import queue
+import threading
+import time
+from src.dropdown_creator import DropdownCreator
+from src.visualizor import Visualizor
+
+
+class WarmupScheduler:
+    """
+    Precomputes in the background every artifact the dashboard dropdowns can request.
+
+    The models of the dates are first loaded concurrently in a few worker processes (see
+    Controller.preload_models). Then, for each date, the scheduler builds the choropleth store, the
+    wordcloud images and the bar charts of every option of the dropdowns (see DropdownCreator), through
+    the same Controller and Visualizor calls as the dashboard callbacks, so the first user to pick a
+    date is served from the figure cache and the render cache. The choropleth store holds both stances,
+    so it is built once per date. The default values of the dropdowns come first, then the other options
+    of the default date, then the other dates in display order.
+
+    By default only as many dates as the model registry keeps resident are warmed, the default date
+    first, so warming the last dates does not evict the models of the first ones.
+
+    The tasks run on a small pool of daemon threads ('workers', 1 by default) and the preload on
+    'preload_workers' processes, so live requests keep most of the CPU, and the scheduler can be
+    cancelled at any time: the queued tasks are dropped and the running ones finish. A failing task
+    is reported and does not stop the others.
+
+    Attributes:
+        controller (Controller): The controller whose caches are warmed.
+        workers (int): Number of worker threads.
+        preload_workers (int): Number of worker processes loading the models.
+        dates (list): The dates to warm.
+        preload (bool): Whether the models are loaded in worker processes before the tasks run.
+        tasks (list): The (kind, date, option) tasks, in priority order.
+        done (int): Number of tasks completed.
+        failed (int): Number of tasks that raised an exception.
+    """
+
+    KINDS = ("choropleth", "wordcloud", "barchart")
+
+    def __init__(
+        self, controller, workers: int = 1, dates: list = None, preload: bool = True, preload_workers: int = 2
+    ) -> None:
+        self.controller = controller
+        self.workers = workers
+        self.preload = preload
+        self.preload_workers = preload_workers
+        self.dates = dates if dates is not None else self.resident_dates(controller)
+        self.tasks = self.plan(self.dates)
+        self.done = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._threads = []
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resident_dates(controller) -> list:
+        """
+        Get the dates the registry can keep resident at once, the default date first.
+
+        Args:
+            controller (Controller): The controller of the dates.
+
+        Returns:
+            list: The dates, in display order.
+        """
+        dates = controller.get_dates()
+        capacity = controller.models.max_models
+        if capacity is None:
+            return dates
+        kept = sorted(dates, key=lambda date: date != DropdownCreator.DEFAULT_DATE)[:capacity]
+        return [date for date in dates if date in kept]
+
+    @classmethod
+    def options(cls) -> dict:
+        """
+        Get the options of each kind of artifact, default option first.
+
+        The choropleth store of a date holds every stance, so only the default stance is listed.
+
+        Returns:
+            dict: The option values of each kind.
+        """
+        dropdowns = {
+            "choropleth": (DropdownCreator.CHOROPLETH_OPTIONS, DropdownCreator.DEFAULT_CHOROPLETH_OPTION),
+            "wordcloud": (DropdownCreator.WORDCLOUD_OPTIONS, DropdownCreator.DEFAULT_WORDCLOUD_OPTION),
+            "barchart": (DropdownCreator.BAR_CHART_OPTIONS, DropdownCreator.DEFAULT_BAR_CHART_OPTION),
+        }
+        options = {
+            kind: sorted((option["value"] for option in options), key=lambda value: value != default)
+            for kind, (options, default) in dropdowns.items()
+        }
+        options["choropleth"] = options["choropleth"][:1]
+        return options
+
+    @classmethod
+    def plan(cls, dates: list) -> list:
+        """
+        List the tasks that warm every artifact of the given dates, in priority order.
+
+        Args:
+            dates (list): The dates to warm, in display order.
+
+        Returns:
+            list: The (kind, date, option) tasks.
+        """
+        options = cls.options()
+        tasks = [(kind, date, option) for date in dates for kind in cls.KINDS for option in options[kind]]
+
+        def priority(task):
+            kind, date, option = task
+            is_default = option == options[kind][0]
+            return (date != DropdownCreator.DEFAULT_DATE, dates.index(date), not is_default, cls.KINDS.index(kind))
+
+        return sorted(tasks, key=priority)
+
+    def run_task(self, kind: str, date: str, option: str) -> None:
+        """
+        Build one artifact the way the dashboard callbacks do, which caches it.
+        """
+        if kind == "choropleth":
+            Visualizor().create_choropleth_store(self.controller.get_choropleth_stances(date))
+        elif kind == "wordcloud":
+            self.controller.get_wordcloud_png(date, option)
+        else:
+            Visualizor().create_bar_chart(self.controller.get_barchart_data(date, option))
+
+    def _preload(self) -> None:
+        try:
+            self.controller.preload_models(self.dates, self.preload_workers)
+        except Exception as error:
+            # The tasks load the models lazily instead
+            print(f"Preloading the models failed: {error!r}")
+
+    def _work(self, preloaded: threading.Thread = None) -> None:
+        if preloaded is not None:
+            preloaded.join()
+        while not self._cancelled.is_set():
+            try:
+                task = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            try:
+                self.run_task(*task)
+            except Exception as error:
+                print(f"Warm-up of {task} failed: {error!r}")
+                with self._lock:
+                    self.failed += 1
+            else:
+                print(f"Warmed {task} in {time.perf_counter() - start:.2f}s")
+                with self._lock:
+                    self.done += 1
+
+    def start(self) -> "WarmupScheduler":
+        """
+        Start warming in the background. Does nothing if the scheduler is already running.
+
+        Returns:
+            WarmupScheduler: The scheduler itself.
+        """
+        if self._threads:
+            return self
+        for task in self.tasks:
+            self._queue.put(task)
+        preloaded = None
+        if self.preload and not self._cancelled.is_set():
+            preloaded = threading.Thread(target=self._preload, name="warmup-preload", daemon=True)
+            self._threads.append(preloaded)
+        self._threads += [
+            threading.Thread(target=self._work, args=(preloaded,), name=f"warmup-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """
+        Stop warming. The queued tasks are dropped, the running ones finish.
+        """
+        self._cancelled.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait for the workers to finish.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait, or None to wait until they finish.
+
+        Returns:
+            bool: Whether all the workers have finished.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not self.is_running()
+
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def progress(self) -> dict:
+        """
+        Report the progress of the warm-up.
+
+        Returns:
+            dict: The number of tasks in total, done and failed, the completed fraction, and whether
+                the warm-up is running and whether it was cancelled.
+        """
+        with self._lock:
+            finished = self.done + self.failed
+            return {
+                "total": len(self.tasks),
+                "done": self.done,
+                "failed": self.failed,
+                "fraction": finished / len(self.tasks) if self.tasks else 1.0,
+                "running": self.is_running(),
+                "cancelled": self._cancelled.is_set(),
+            }
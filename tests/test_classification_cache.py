@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.classification_cache import ClassificationCache
+
+
+class TestClassificationCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache", "classifications.sqlite")
+        self.calls = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def predict(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text), -len(text), 0.5] for text in texts], dtype=np.float32)
+
+    def test_classifies_each_text_once(self):
+        cache = ClassificationCache(self.path, "v1")
+        texts = ["war news a", "war news b", "peace", "peace"]
+        normalized = ["war news", "war news", "peace", "peace"]
+        logits = cache.classify(texts, normalized, self.predict)
+        self.assertEqual(self.calls, [["war news a", "peace"]])
+        np.testing.assert_array_equal(logits[1], logits[0])
+        self.assertEqual(logits.shape, (4, 3))
+        self.assertEqual(cache.stats(), {"lookups": 4, "hits": 2, "misses": 2, "hit_rate": 0.5, "entries": 2})
+        cache.close()
+
+        # The predictions persist across runs
+        cache = ClassificationCache(self.path, "v1")
+        np.testing.assert_array_equal(cache.classify(texts, normalized, self.predict), logits)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(cache.stats()["hit_rate"], 1.0)
+        position = cache._connection.execute("SELECT position FROM classifications").fetchone()[0]
+        self.assertEqual(position, 0)
+
+    def test_model_version_is_part_of_the_key(self):
+        ClassificationCache(self.path, "v1").classify(["peace"], ["peace"], self.predict)
+        cache = ClassificationCache(self.path, "v2")
+        cache.classify(["peace"], ["peace"], self.predict)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_many_keys(self):
+        cache = ClassificationCache(self.path, "v1")
+        texts = [str(i) for i in range(1200)]
+        first = cache.classify(texts, texts, self.predict)
+        np.testing.assert_array_equal(cache.classify(texts, texts, self.predict), first)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(cache.stats()["entries"], 1200)
+
+
+if __name__ == "__main__":
+    unittest.main()
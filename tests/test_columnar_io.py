@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.columnar_io import hashtag_texts, read_parquet, write_parquet
+
+
+class TestColumnarIO(unittest.TestCase):
+    def test_hashtag_texts(self):
+        raw = "[{'text': 'Ukraine', 'indices': [0, 8]}, {'text': 'Слава_Україні', 'indices': [9, 22]}]"
+        self.assertEqual(hashtag_texts(raw), ["Ukraine", "Слава_Україні"])
+        self.assertEqual(hashtag_texts("[]"), [])
+        self.assertEqual(hashtag_texts(float("nan")), [])
+        self.assertEqual(hashtag_texts(["Kyiv"]), ["Kyiv"])
+
+    def test_parquet_round_trip(self):
+        data = pd.DataFrame(
+            {
+                "text": ["hello", "world"],
+                "hashtags": ["[{'text': 'Ukraine', 'indices': [0, 8]}]", "[]"],
+                "retweetcount": ["3", None],
+                "conflict_position": [1, None],
+            }
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tweets.parquet")
+            write_parquet(data, path)
+            loaded = read_parquet(path, ["text", "hashtags", "retweetcount", "missing"])
+        self.assertEqual(list(loaded.columns), ["text", "hashtags", "retweetcount"])
+        self.assertEqual(loaded["hashtags"].tolist(), [["Ukraine"], []])
+        self.assertEqual(loaded["retweetcount"].tolist(), [3, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
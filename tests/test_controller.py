@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch
-from src.controller import Controller
+import pandas as pd
+from src.controller import Controller, HASHTAG_WORDCLOUD, WORDCLOUD_RENDER_VERSION
+from src.model import Model
 
 
 class TestController(unittest.TestCase):
@@ -15,6 +17,13 @@ class TestController(unittest.TestCase):
     def test_get_all_countries(self):
         countries = self.controller.get_all_countries()
         self.assertIsNotNone(countries)
+        # The countries are read without building any model
+        self.assertEqual(self.controller.models.stats()["misses"], 0)
+        expected = set()
+        for date in self.controller.get_dates():
+            expected.update(self.controller.models[date].get_all_countries())
+        self.assertEqual(countries, sorted(expected))
+        self.assertEqual(self.controller.get_all_countries(), countries)
     
     def test_get_dates(self):
         # Test the get_dates method
@@ -30,6 +39,62 @@ class TestController(unittest.TestCase):
         dates = self.controller.get_dates()
         self.assertEqual(dates, expected_dates)
 
+    def test_plot_country_polarity_time(self):
+        countries = self.controller.get_all_countries()[:2]
+        df = self.controller.plot_country_polarity_time(countries)
+        self.assertEqual(len(df), len(countries) * len(self.controller.get_dates()))
+        model = self.controller.models["02/04"]
+        first = df[df["Country"] == countries[0]].iloc[0]
+        self.assertAlmostEqual(first["Polarity"], model.get_average_polarity_for_country(countries[0]))
+
+    def test_polarity_time_series_does_not_load_models(self):
+        controller = Controller(max_models=2)
+        controller.models["02/04"]
+        controller.plot_country_polarity_time(controller.get_all_countries()[:2])
+        self.assertEqual(controller.polarity_time_series.missing_dates(), [])
+        stats = controller.models.stats()
+        self.assertEqual((stats["misses"], stats["evictions"]), (1, 0))
+        self.assertEqual(stats["resident_dates"], ["02/04"])
+
+    def test_wordcloud_key_does_not_load_models(self):
+        controller = Controller()
+        key = controller.wordcloud_key("08/04", "wordcloud1")
+        self.assertEqual(controller.models.stats()["misses"], 0)
+        fingerprint = controller.models["08/04"].fingerprint
+        expected = controller.render_cache.key(
+            WORDCLOUD_RENDER_VERSION, "08/04", "wordcloud1", fingerprint, HASHTAG_WORDCLOUD, 1.0
+        )
+        self.assertEqual(key, expected)
+        self.assertEqual(controller.wordcloud_key("08/04", "wordcloud1"), key)
+
+    def test_cached_wordcloud_does_not_load_the_model(self):
+        controller = Controller()
+        image = controller.get_wordcloud_png("19/08", "wordcloud1")
+        # Like a restart: a new registry and render cache, with the rendered image on disk
+        controller = Controller()
+        self.assertEqual(controller.get_wordcloud_png("19/08", "wordcloud1"), image)
+        self.assertEqual(controller.models.stats()["misses"], 0)
+
+    def test_models_are_loaded_lazily(self):
+        controller = Controller()
+        controller.get_dates()
+        self.assertEqual(controller.models.stats()["misses"], 0)
+        controller.models["02/04"]
+        self.assertEqual(controller.models.stats()["resident_dates"], ["02/04"])
+
+    def test_preload_models(self):
+        controller = Controller()
+        dates = controller.get_dates()[:3]
+        result = controller.preload_models(dates, workers=2)
+        self.assertEqual(set(result["loaded"]), set(dates))
+        self.assertEqual(result["failed"], {})
+        self.assertEqual(controller.polarity_time_series.missing_dates(), controller.get_dates()[3:])
+
+        model = controller.models["08/04"]
+        expected = Model(controller.models.datasets["08/04"])
+        self.assertEqual(model.fingerprint, expected.fingerprint)
+        pd.testing.assert_frame_equal(model.getData(), expected.getData())
+
 
 
 
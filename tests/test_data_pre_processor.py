@@ -0,0 +1,215 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import torch
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+from src.columnar_io import read_parquet
+from src.data_pre_processor import DataPreProcessor
+
+WORDS = ["ukraine", "russia", "war", "peace", "kyiv", "moscow", "support", "stop", "the", "we", "army", "news"]
+
+LOCATIONS = ["Kyiv, Ukraine", "New York", "nan", "London", "Paris, France", "Moscow", "Berlin", "Nowhere at all here"]
+
+
+def save_tiny_bert(directory: str) -> None:
+    """
+    Save a small randomly initialized BERT classifier and its tokenizer, in place of the trained model.
+    """
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS + ["#", ":", "/", "."]
+    with open(os.path.join(directory, "vocab.txt"), "w") as file:
+        file.write("\n".join(vocab) + "\n")
+    BertTokenizer(os.path.join(directory, "vocab.txt")).save_pretrained(directory)
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+        max_position_embeddings=128,
+        num_labels=3,
+        initializer_range=0.5,  # Large enough weights for the tweets to get distinct logits
+    )
+    BertForSequenceClassification(config).save_pretrained(directory)
+
+
+def raw_tweets(rows: int) -> pd.DataFrame:
+    """
+    Build a raw daily export with the columns of the Twitter dataset.
+    """
+    return pd.DataFrame(
+        {
+            "userid": range(rows),
+            "username": [f"user{i % 7}" for i in range(rows)],
+            "location": [LOCATIONS[i % len(LOCATIONS)] for i in range(rows)],
+            "following": [i * 3 for i in range(rows)],
+            "followers": [i * 5 for i in range(rows)],
+            "retweetcount": [i % 11 for i in range(rows)],
+            "text": [
+                " ".join(WORDS[(i * k) % len(WORDS)] for k in range(1, 2 + i % 9)) + f" https://t.co/{i}"
+                for i in range(rows)
+            ],
+            "hashtags": [f"[{{'text': '{WORDS[i % len(WORDS)]}', 'indices': [0, 5]}}]" for i in range(rows)],
+            "language": "en",
+            "favorite_count": [i % 13 for i in range(rows)],
+            "coordinates": None,
+        }
+    )
+
+
+class TestDataPreProcessor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.model_path = os.path.join(cls.directory.name, "model")
+        os.makedirs(cls.model_path)
+        save_tiny_bert(cls.model_path)
+        cls.raw = os.path.join(cls.directory.name, "0402_Tweets.csv")
+        raw_tweets(50).to_csv(cls.raw, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def preprocess(self, output: str, **kwargs) -> DataPreProcessor:
+        output_dir = os.path.join(self.directory.name, output)
+        os.makedirs(output_dir, exist_ok=True)
+        processor = DataPreProcessor(self.raw, model_path=self.model_path, output_dir=output_dir, **kwargs)
+        processor.preprocess_data()
+        return processor
+
+    def test_streaming_matches_whole_file(self):
+        whole = self.preprocess("whole")
+        streamed = self.preprocess("streamed", chunksize=8)
+        expected = pd.read_csv(whole.output_path("csv"), index_col=0)
+        result = pd.read_csv(streamed.output_path("csv"), index_col=0)
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(len(result), 50)
+        self.assertNotIn("userid", result.columns)
+        self.assertFalse(result["tweet"].str.contains("https").any())
+        self.assertEqual(result.loc[result["location"] == "New York", "ISO"].unique().tolist(), ["USA"])
+        # Only the last chunk stays in memory
+        self.assertLessEqual(len(streamed.data), 8)
+        self.assertFalse(os.path.exists(streamed.parts_directory()))
+
+    def test_streaming_parquet(self):
+        whole = self.preprocess("whole_parquet", output_format="parquet")
+        streamed = self.preprocess("streamed_parquet", output_format="parquet", chunksize=16)
+        pd.testing.assert_frame_equal(
+            read_parquet(streamed.output_path("parquet")), read_parquet(whole.output_path("parquet"))
+        )
+
+    def test_sampling_is_optional_and_seeded(self):
+        first = self.preprocess("sampled", chunksize=10, sample=0.5, seed=3)
+        sampled = pd.read_csv(first.output_path("csv"), index_col=0)
+        self.assertEqual(len(sampled), 25)
+        again = self.preprocess("sampled_again", chunksize=10, sample=0.5, seed=3)
+        self.assertEqual(pd.read_csv(again.output_path("csv"), index_col=0).index.tolist(), sampled.index.tolist())
+        with self.assertRaises(ValueError):
+            DataPreProcessor(self.raw, chunksize=10, sample=2, model_path=self.model_path)
+
+    def test_predict_logits_matches_full_padding(self):
+        processor = DataPreProcessor(self.raw, chunksize=10, model_path=self.model_path, batch_size=4)
+        texts = raw_tweets(23)["text"].tolist()
+        tokens = processor.tokenizer(texts, max_length=128, padding=True, truncation=True, return_tensors="pt")
+        with torch.no_grad():
+            expected = processor.model(tokens["input_ids"], attention_mask=tokens["attention_mask"]).logits.numpy()
+        logits = processor.predict_logits(texts)
+        self.assertEqual(logits.shape, (23, 3))
+        np.testing.assert_allclose(logits, expected, atol=1e-5)
+
+    def test_int8_backend(self):
+        validation = os.path.join(self.directory.name, "validation.csv")
+        tweets = raw_tweets(40)
+        tweets["sentiment"] = [(-1, 0, 1)[i % 3] for i in range(40)]
+        tweets[["text", "sentiment"]].to_csv(validation, index=False)
+
+        fp32 = DataPreProcessor(self.raw, chunksize=10, model_path=self.model_path)
+        self.assertEqual(fp32.check_parity(validation)["max_logit_difference"], 0)
+        int8 = DataPreProcessor(self.raw, chunksize=10, model_path=self.model_path, backend="int8")
+        self.assertEqual(int8.device.type, "cpu")
+        self.assertIsInstance(int8.model.classifier, torch.ao.nn.quantized.dynamic.Linear)
+        parity = int8.check_parity(validation)
+        self.assertEqual(parity["rows"], 40)
+        self.assertLess(parity["max_logit_difference"], 0.5)
+        self.assertGreaterEqual(parity["agreement"], 0.9)
+        self.assertEqual(set(parity), {"rows", "agreement", "max_logit_difference", "accuracy", "reference_accuracy"})
+        with self.assertRaises(ValueError):
+            DataPreProcessor(self.raw, chunksize=10, model_path=self.model_path, backend="fp16")
+
+    def test_classification_cache(self):
+        cache = os.path.join(self.directory.name, "classifications.sqlite")
+        expected = pd.read_csv(self.preprocess("uncached", chunksize=20).output_path("csv"), index_col=0)
+        normalized = {DataPreProcessor.normalize_text(text) for text in raw_tweets(50)["text"]}
+        self.assertLess(len(normalized), 50)
+
+        first = self.preprocess("cached", chunksize=20, classification_cache=cache)
+        self.assertEqual(first.classification_cache.stats()["misses"], len(normalized))
+        pd.testing.assert_frame_equal(pd.read_csv(first.output_path("csv"), index_col=0), expected)
+
+        with patch.object(DataPreProcessor, "predict_logits", side_effect=AssertionError("classified twice")):
+            second = self.preprocess("cached_again", chunksize=20, classification_cache=cache)
+        self.assertEqual(second.classification_cache.stats()["hit_rate"], 1.0)
+        pd.testing.assert_frame_equal(pd.read_csv(second.output_path("csv"), index_col=0), expected)
+
+    def interrupted_run(self, output: str, after: int, **kwargs) -> None:
+        """
+        Run a streamed preprocessing that crashes after 'after' chunks.
+        """
+        transform = DataPreProcessor.transform
+        calls = []
+
+        def crashing_transform(processor, verbose=True):
+            if len(calls) == after:
+                raise KeyboardInterrupt
+            calls.append(len(processor.data))
+            transform(processor, verbose)
+
+        with patch.object(DataPreProcessor, "transform", crashing_transform):
+            with self.assertRaises(KeyboardInterrupt):
+                self.preprocess(output, **kwargs)
+
+    def test_resume_after_crash(self):
+        for output_format in DataPreProcessor.OUTPUT_FORMATS:
+            expected = self.preprocess("uninterrupted_" + output_format, output_format=output_format, chunksize=8)
+            self.interrupted_run("resumed_" + output_format, 3, output_format=output_format, chunksize=8)
+
+            transform = DataPreProcessor.transform
+            chunks = []
+
+            def counting_transform(processor, verbose=True):
+                chunks.append(len(processor.data))
+                transform(processor, verbose)
+
+            with patch.object(DataPreProcessor, "transform", counting_transform):
+                resumed = self.preprocess("resumed_" + output_format, output_format=output_format, chunksize=8)
+            # Only the chunks that were not committed are processed again
+            self.assertEqual(chunks, [8, 8, 8, 2])
+            path, reference = resumed.output_path(output_format), expected.output_path(output_format)
+            if output_format == "csv":
+                with open(path, "rb") as result, open(reference, "rb") as reference:
+                    self.assertEqual(result.read(), reference.read())
+            else:
+                pd.testing.assert_frame_equal(read_parquet(path), read_parquet(reference))
+            self.assertFalse(os.path.exists(resumed.parts_directory()))
+
+    def test_resume_keeps_sampling(self):
+        self.interrupted_run("sampled_resumed", 2, chunksize=10, sample=0.5)
+        resumed = self.preprocess("sampled_resumed", chunksize=10, sample=0.5)
+        expected = self.preprocess("sampled_seeded", chunksize=10, sample=0.5, seed=resumed.seed)
+        self.assertEqual(
+            pd.read_csv(resumed.output_path("csv"), index_col=0).index.tolist(),
+            pd.read_csv(expected.output_path("csv"), index_col=0).index.tolist(),
+        )
+
+    def test_other_settings_start_over(self):
+        self.interrupted_run("restarted", 2, chunksize=8)
+        restarted = self.preprocess("restarted", chunksize=10)
+        self.assertEqual(len(pd.read_csv(restarted.output_path("csv"), index_col=0)), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
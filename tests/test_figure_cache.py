@@ -0,0 +1,54 @@
+import unittest
+import pandas as pd
+import plotly.graph_objects as go
+from src.figure_cache import FigureCache
+from src.visualizor import Visualizor
+
+
+class TestFigureCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = FigureCache()
+        self.builds = []
+
+    def build(self, values):
+        def build():
+            self.builds.append(values)
+            return go.Figure(go.Bar(y=values))
+        return build
+
+    def test_key_depends_on_chart_and_data(self):
+        data = pd.DataFrame({"username": ["a", "b"], "count": [2, 1]})
+        self.assertEqual(FigureCache.key("bar", data), FigureCache.key("bar", data.copy()))
+        self.assertNotEqual(FigureCache.key("bar", data), FigureCache.key("line", data))
+        self.assertNotEqual(FigureCache.key("bar", data), FigureCache.key("bar", data.assign(count=[3, 1])))
+        self.assertNotEqual(FigureCache.key("choropleth", (["FRA"], [1], ["France"])),
+                            FigureCache.key("choropleth", (["FRA"], [2], ["France"])))
+
+    def test_hits_and_misses(self):
+        first = self.cache.get_or_build("bar", [1, 2], self.build([1, 2]))
+        second = self.cache.get_or_build("bar", [1, 2], self.build([1, 2]))
+        self.assertIs(first, second)
+        self.assertEqual(first["data"][0]["type"], "bar")
+        self.assertEqual(len(self.builds), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_size_cap(self):
+        self.cache.get_or_build("bar", [1], self.build([1]))
+        cache = FigureCache(max_bytes=self.cache.stats()["bytes"] + 1)
+        cache.get_or_build("bar", [1], self.build([1]))
+        cache.get_or_build("bar", [2], self.build([2]))
+        self.assertEqual(cache.stats()["figures"], 1)
+        cache.get_or_build("bar", [1], self.build([1]))
+        self.assertEqual(len(self.builds), 4)
+
+    def test_visualizor_shares_the_cache(self):
+        data = pd.DataFrame({"username": ["a", "b"], "count": [2, 1]})
+        hits = Visualizor.figure_cache.hits
+        graph = Visualizor().create_bar_chart(data)
+        self.assertEqual(Visualizor().create_bar_chart(data).figure, graph.figure)
+        self.assertEqual(Visualizor.figure_cache.hits, hits + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,12 +19,61 @@ class TestModel(unittest.TestCase):
         average_polarity = self.model.get_average_polarity_for_country(country)
         self.assertLess(average_polarity - 0.15656250000000002, 0.0001)
 
+    def test_country_index_matches_scan(self):
+        data = self.model.data
+        for country in self.model.get_all_countries():
+            rows = data[data["country"] == country]
+            self.assertAlmostEqual(self.model.get_average_polarity_for_country(country), rows["polarity"].mean())
+            self.assertEqual(self.model.country_rows[country].tolist(), [data.index.get_loc(i) for i in rows.index])
+
+    def test_top_k(self):
+        data_before = self.model.data.copy()
+        top = self.model.top_k("retweets", 5)
+        expected = self.model.data["retweetcount"].sort_values(ascending=False).head(5)
+        self.assertEqual(top["count"].tolist(), expected.tolist())
+        top["count"] = 0
+        self.assertEqual(self.model.top_k("retweets", 5)["count"].tolist(), expected.tolist())
+        self.assertTrue(self.model.data.equals(data_before))
+
     def test_extract_hashtags(self):
         # Test if the hashtags are extracted correctly
         hashtags = self.model.data['hashtags']
         self.assertIsNotNone(hashtags)
 
 
+    def test_hashtag_index(self):
+        hashtags = self.model.data["hashtags"]
+        self.assertEqual(len(self.model.hashtag_table), hashtags.map(len).sum())
+        self.assertEqual(self.model.hashtag_counts.sum(), len(self.model.hashtag_table))
+        for row_id, hashtag in self.model.hashtag_table.head(20).itertuples(index=False):
+            self.assertIn(hashtag, hashtags.iloc[row_id])
+
+    def test_source_fingerprint(self):
+        dataset = "data/tweets_processed/0402_UkraineCombinedTweetsDeduped_PROCESSED.csv"
+        self.assertEqual(Model.source_fingerprint(dataset), self.model.fingerprint)
+        self.assertNotEqual(Model.source_fingerprint(dataset, sentiment_backend="lexicon"), self.model.fingerprint)
+
+    def test_schema_and_memory_report(self):
+        self.assertEqual(str(self.model.data["country"].dtype), "category")
+        # Near-unique strings are not worth a categorical
+        self.assertEqual(str(self.model.data["username"].dtype), "object")
+        self.assertEqual(str(self.model.data["polarity"].dtype), "float32")
+        report = self.model.memory_report()
+        self.assertEqual(report.index.tolist(), self.model.data.columns.tolist())
+        self.assertGreater(report["bytes"].sum(), 0)
+
+    def test_stance_table_matches_groupby(self):
+        for camp, is_pro_russian in ((1, True), (2, False)):
+            expected = (
+                self.model.data.groupby(["ISO", "country"], observed=True)["conflict_position"]
+                .apply(lambda x: (x == camp).sum())
+                .reset_index()
+            )
+            iso_list, counts, countries = self.model.get_number_pro_ukr_rus(is_pro_russian)
+            self.assertEqual(iso_list, expected["ISO"].tolist())
+            self.assertEqual(counts, expected["conflict_position"].tolist())
+            self.assertEqual(countries, expected["country"].tolist())
+
     def test_getData(self):
         # Test if the data is returned correctly
         data = self.model.getData()
@@ -0,0 +1,151 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, dataset, workers=None):
+        self.dataset = dataset
+        self.workers = workers
+        self.data = pd.DataFrame({"value": range(100)})
+
+    def getData(self):
+        return self.data
+
+
+class FrameModel(FakeModel):
+    """
+    A fake model that supports being rebuilt from its data, like Model.
+    """
+
+    def __init__(self, dataset, workers=None, data=None, fingerprint=None):
+        if dataset.startswith("missing"):
+            raise FileNotFoundError(dataset)
+        super().__init__(dataset)
+        self.fingerprint = fingerprint or "fingerprint of " + dataset
+        self.data = data if data is not None else pd.DataFrame(
+            {"value": range(100), "label": pd.Categorical(["x", "y"] * 50), "tags": [["t"]] * 100}
+        )
+        self.country_polarity = pd.DataFrame({"mean": [0.5], "count": [len(self.data)]}, index=[dataset])
+
+
+class SlowModel(FakeModel):
+    """
+    A fake model whose build of 'slow.csv' waits until 'release' is set.
+    """
+
+    builds = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def __init__(self, dataset, workers=None):
+        self.builds.append(dataset)
+        if dataset == "slow.csv":
+            self.started.set()
+            self.release.wait(10)
+        super().__init__(dataset)
+        self.country_polarity = pd.DataFrame({"mean": [0.5], "count": [1]}, index=[dataset])
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.datasets = {"a": "a.csv", "b": "b.csv", "c": "c.csv"}
+
+    def test_lazy_loading(self):
+        registry = ModelRegistry(self.datasets, factory=FakeModel)
+        self.assertEqual(list(registry.keys()), ["a", "b", "c"])
+        self.assertEqual(registry.stats()["misses"], 0)
+        self.assertEqual(registry["b"].dataset, "b.csv")
+        # Lazy builds run in the server threads, without a sentiment pool
+        self.assertEqual(registry["b"].workers, 1)
+        self.assertIs(registry["b"], registry.get("b"))
+        stats = registry.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 1))
+        self.assertEqual(stats["resident_dates"], ["b"])
+        self.assertGreater(stats["resident_bytes"], 0)
+
+    def test_unknown_date(self):
+        registry = ModelRegistry(self.datasets, factory=FakeModel)
+        with self.assertRaises(KeyError):
+            registry["z"]
+
+    def test_lru_eviction_by_count(self):
+        registry = ModelRegistry(self.datasets, factory=FakeModel, max_models=2)
+        registry["a"]
+        registry["b"]
+        registry["a"]
+        registry["c"]
+        stats = registry.stats()
+        self.assertEqual(stats["resident_dates"], ["a", "c"])
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_eviction_by_bytes_keeps_last_model(self):
+        registry = ModelRegistry(self.datasets, factory=FakeModel, max_bytes=1)
+        registry["a"]
+        registry["b"]
+        self.assertEqual(registry.stats()["resident_dates"], ["b"])
+        self.assertFalse(registry.is_loaded("a"))
+
+    def test_builds_do_not_block_other_dates(self):
+        SlowModel.builds.clear()
+        SlowModel.started.clear()
+        SlowModel.release.clear()
+        registry = ModelRegistry({"a": "a.csv", "slow": "slow.csv"}, factory=SlowModel)
+        registry["a"]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            slow = [executor.submit(registry.get, "slow") for _ in range(2)]
+            self.assertTrue(SlowModel.started.wait(10))
+            # A resident date is served while another date builds
+            self.assertEqual(registry["a"].dataset, "a.csv")
+            SlowModel.release.set()
+            models = [future.result(10) for future in slow]
+        # Concurrent requests for the same date share one build
+        self.assertIs(models[0], models[1])
+        self.assertEqual(SlowModel.builds, ["a.csv", "slow.csv"])
+        self.assertEqual(registry.stats()["misses"], 2)
+
+    def test_country_polarity_waits_for_builds(self):
+        SlowModel.builds.clear()
+        SlowModel.started.clear()
+        SlowModel.release.clear()
+        registry = ModelRegistry({"slow": "slow.csv"}, factory=SlowModel)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            model = executor.submit(registry.get, "slow")
+            self.assertTrue(SlowModel.started.wait(10))
+            aggregates = executor.submit(registry.country_polarity)
+            SlowModel.release.set()
+            # The aggregates come from the model being built, not from another build in a worker
+            self.assertIs(aggregates.result(10)["slow"], model.result(10).country_polarity)
+
+    def test_load_all(self):
+        loaded = []
+        registry = ModelRegistry(
+            {"a": "a.csv", "b": "b.csv", "z": "missing.csv"},
+            factory=FrameModel,
+            on_load=lambda date, model: loaded.append(date),
+        )
+        registry["b"]
+        result = registry.load_all(workers=2)
+        self.assertEqual(set(result["loaded"]), {"a"})
+        self.assertIsInstance(result["failed"]["z"], FileNotFoundError)
+        self.assertEqual(loaded, ["b", "a"])
+        self.assertFalse(registry.is_loaded("z"))
+
+        model = registry["a"]
+        self.assertEqual(model.fingerprint, "fingerprint of a.csv")
+        pd.testing.assert_frame_equal(model.getData(), FrameModel("a.csv").getData())
+
+    def test_country_polarity(self):
+        registry = ModelRegistry({"a": "a.csv", "b": "b.csv", "z": "missing.csv"}, factory=FrameModel)
+        resident = registry["a"]
+        aggregates = registry.country_polarity(workers=2)
+        self.assertEqual(set(aggregates), {"a", "b"})
+        self.assertIs(aggregates["a"], resident.country_polarity)
+        self.assertEqual(aggregates["b"].index.tolist(), ["b.csv"])
+        self.assertEqual(registry.stats()["resident_dates"], ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import threading
+import unittest
+import pandas as pd
+from src.polarity_time_series import PolarityTimeSeries
+
+
+def country_polarity(means: dict, counts: dict) -> pd.DataFrame:
+    return pd.DataFrame({"mean": means, "count": counts})
+
+
+class TestPolarityTimeSeries(unittest.TestCase):
+    def setUp(self):
+        self.series = PolarityTimeSeries(["d1", "d2"])
+        self.series.add_date("d1", country_polarity({"FR": 0.5, "US": -0.2}, {"FR": 2, "US": 3}))
+
+    def test_missing_dates(self):
+        self.assertEqual(self.series.missing_dates(), ["d2"])
+        self.series.add_date("d2", country_polarity({"DE": 0.1}, {"DE": 1}))
+        self.assertEqual(self.series.missing_dates(), [])
+
+    def test_get_several_countries(self):
+        self.series.add_date("d2", country_polarity({"FR": 0.1}, {"FR": 1}))
+        df = self.series.get(["FR", "US", "XX"])
+        self.assertEqual(df["Country"].tolist(), ["FR", "FR", "US", "US", "XX", "XX"])
+        self.assertEqual(df["Date"].tolist(), ["d1", "d2"] * 3)
+        self.assertEqual(df["Polarity"].tolist(), [0.5, 0.1, -0.2, 0.0, 0.0, 0.0])
+        self.assertEqual(df["Count"].tolist(), [2, 1, 3, 0, 0, 0])
+
+    def test_add_and_remove_dates(self):
+        self.series.add_date("d3", country_polarity({"US": 0.3}, {"US": 4}))
+        self.series.remove_date("d1")
+        df = self.series.get(["US"])
+        self.assertEqual(df["Date"].tolist(), ["d2", "d3"])
+        self.assertEqual(df["Polarity"].tolist(), [0.0, 0.3])
+
+    def test_concurrent_add_date(self):
+        series = PolarityTimeSeries([])
+        dates = ["d{}".format(i) for i in range(8)]
+        countries = {"C{}".format(i): 1 for i in range(50)}
+        threads = [
+            threading.Thread(target=series.add_date, args=(date, country_polarity(dict.fromkeys(countries, 0.1), countries)))
+            for date in dates
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(series.countries), sorted(countries))
+        self.assertEqual(series.missing_dates(), [])
+        df = series.get(list(countries))
+        self.assertEqual(len(df), len(countries) * len(dates))
+        self.assertTrue((df["Count"] == 1).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
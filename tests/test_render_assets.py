@@ -0,0 +1,32 @@
+import unittest
+from src import render_assets
+
+MASK = "src/wordclouds/drapeau-ukraine.png"
+
+
+class TestRenderAssets(unittest.TestCase):
+    def test_assets_are_loaded_once(self):
+        self.assertIs(render_assets.load_mask(MASK), render_assets.load_mask(MASK))
+        self.assertIs(render_assets.mask_colors(MASK), render_assets.mask_colors(MASK))
+        self.assertIs(render_assets.wordcloud_stopwords(), render_assets.wordcloud_stopwords())
+        self.assertIs(render_assets.colormap(("royalblue", "gold")), render_assets.colormap(("royalblue", "gold")))
+
+    def test_masks_are_read_only(self):
+        with self.assertRaises(ValueError):
+            render_assets.load_mask(MASK)[0, 0, 0] = 0
+
+    def test_downscaled_mask(self):
+        full = render_assets.load_mask(MASK)
+        half = render_assets.load_mask(MASK, 0.5)
+        self.assertEqual(half.shape[0], round(full.shape[0] * 0.5))
+        self.assertEqual(half.shape[1], round(full.shape[1] * 0.5))
+        # Nearest-neighbour resampling introduces no new colors
+        self.assertTrue(set(map(tuple, half.reshape(-1, 4))) <= set(map(tuple, full.reshape(-1, 4))))
+
+    def test_stopwords(self):
+        stopwords = render_assets.wordcloud_stopwords()
+        self.assertTrue({"the", "https", "co", "will", "para"} <= stopwords)
+
+
+if __name__ == "__main__":
+    unittest.main()
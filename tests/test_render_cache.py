@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.render_cache import RenderCache
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "renders")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key_depends_on_every_part(self):
+        key = RenderCache.key("02/04", "wordcloud1", "abc", {"width": 800})
+        self.assertEqual(key, RenderCache.key("02/04", "wordcloud1", "abc", {"width": 800}))
+        self.assertNotEqual(key, RenderCache.key("02/04", "wordcloud1", "abd", {"width": 800}))
+        self.assertNotEqual(key, RenderCache.key("02/04", "wordcloud1", "abc", {"width": 400}))
+
+    def test_memory_and_disk_tiers(self):
+        cache = RenderCache(self.path)
+        renders = []
+        render = lambda: renders.append(1) or b"image"
+        self.assertEqual(cache.get_or_render("k", render), b"image")
+        self.assertEqual(cache.get_or_render("k", render), b"image")
+        self.assertEqual(len(renders), 1)
+
+        restarted = RenderCache(self.path)
+        self.assertEqual(restarted.get_or_render("k", render), b"image")
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_size_caps(self):
+        cache = RenderCache(self.path, max_memory_bytes=10, max_disk_bytes=10)
+        cache.put("a", b"x" * 6)
+        cache.put("b", b"y" * 6)
+        self.assertEqual(cache.stats()["memory_bytes"], 6)
+        self.assertEqual(cache.stats()["disk_bytes"], 6)
+        self.assertEqual(cache.get("b"), b"y" * 6)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_concurrent_puts(self):
+        # Separate caches on one directory, as in separate server processes
+        caches = [RenderCache(self.path) for _ in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: caches[i % 4].put("k", b"image" * 10000), range(40)))
+        self.assertEqual(RenderCache(self.path).get("k"), b"image" * 10000)
+        self.assertEqual(os.listdir(self.path), ["k.bin"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import pandas as pd
+from textblob import TextBlob
+from src.sentiment import LexiconSentimentScorer, SentimentEngine
+
+
+class TestSentimentEngine(unittest.TestCase):
+    def setUp(self):
+        self.texts = pd.Series(
+            ["I love this", "This is terrible", "Nothing to see", "I love this", None, "Great news!"] * 5
+        )
+
+    def expected(self):
+        return [0 if pd.isna(text) else TextBlob(text).sentiment.polarity for text in self.texts]
+
+    def test_single_process(self):
+        polarities = SentimentEngine(workers=1).polarities(self.texts)
+        self.assertEqual(polarities.tolist(), self.expected())
+
+    def test_process_pool(self):
+        polarities = SentimentEngine(workers=2, chunk_size=2).polarities(self.texts)
+        self.assertEqual(polarities.tolist(), self.expected())
+        self.assertTrue(polarities.index.equals(self.texts.index))
+
+
+class TestLexiconSentimentScorer(unittest.TestCase):
+    def test_matches_textblob_on_simple_sentences(self):
+        texts = pd.Series(["the war is terrible", "not good", "It isn't bad", "good bad great"])
+        polarities = LexiconSentimentScorer().polarities(texts)
+        expected = [TextBlob(text).sentiment.polarity for text in texts]
+        for polarity, reference in zip(polarities, expected):
+            self.assertAlmostEqual(polarity, reference)
+
+    def test_missing_and_neutral_texts(self):
+        polarities = LexiconSentimentScorer().polarities(pd.Series([None, "", "the tank"]))
+        self.assertEqual(polarities.tolist(), [0.0, 0.0, 0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.snapshot_cache import SnapshotCache
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SnapshotCache(os.path.join(self.directory.name, "snapshots"))
+        self.source = os.path.join(self.directory.name, "tweets.csv")
+        with open(self.source, "w") as file:
+            file.write("text\nhello\n")
+        self.data = pd.DataFrame({"text": ["hello"], "polarity": [0.5], "hashtags": [["Ukraine"]]})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        key = self.cache.key(self.source, "v1")
+        self.assertIsNone(self.cache.load(self.source, key))
+        self.cache.save(self.source, key, self.data)
+        loaded = self.cache.load(self.source, key)
+        self.assertTrue(loaded.equals(self.data))
+        self.assertEqual(loaded["hashtags"][0], ["Ukraine"])
+
+    def test_key_changes_with_source_and_code(self):
+        key = self.cache.key(self.source, "v1")
+        self.assertNotEqual(key, self.cache.key(self.source, "v2"))
+        with open(self.source, "a") as file:
+            file.write("world\n")
+        self.assertNotEqual(key, self.cache.key(self.source, "v1"))
+
+    def test_concurrent_saves(self):
+        key = self.cache.key(self.source, "v1")
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: self.cache.save(self.source, key, self.data), range(8)))
+        self.assertTrue(self.cache.load(self.source, key).equals(self.data))
+        self.assertEqual(os.listdir(self.cache.directory), [os.path.basename(self.cache.path(self.source, key))])
+
+    def test_outdated_snapshots_are_removed(self):
+        old_key = self.cache.key(self.source, "v1")
+        new_key = self.cache.key(self.source, "v2")
+        self.cache.save(self.source, old_key, self.data)
+        self.cache.save(self.source, new_key, self.data)
+        self.assertFalse(os.path.exists(self.cache.path(self.source, old_key)))
+        self.assertTrue(os.path.exists(self.cache.path(self.source, new_key)))
+
+
+if __name__ == "__main__":
+    unittest.main()
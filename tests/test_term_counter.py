@@ -0,0 +1,41 @@
+import unittest
+from wordcloud import WordCloud, STOPWORDS
+from src.term_counter import count_terms, count_weighted_terms
+
+
+class TestTermCounter(unittest.TestCase):
+    def setUp(self):
+        self.texts = [
+            "Russia's army and the Russian army, 2022 #StandWithUkraine",
+            "Ukraine needs weapons. UKRAINE needs the weapon now",
+            "Ukraine ukraine Ukraine's cities, the city of Kyiv",
+            "Stop the war https://t.co/abc",
+        ]
+        self.stopwords = set(STOPWORDS) | {"https", "t", "co"}
+
+    def test_matches_wordcloud_process_text(self):
+        for normalize_plurals in (True, False):
+            wordcloud = WordCloud(stopwords=self.stopwords, collocations=False, normalize_plurals=normalize_plurals)
+            expected = wordcloud.process_text(" ".join(self.texts))
+            self.assertEqual(count_terms(self.texts, self.stopwords, normalize_plurals), expected)
+
+    def test_counts(self):
+        frequencies = count_terms(self.texts, self.stopwords)
+        self.assertEqual(frequencies["Ukraine"], 5)
+        self.assertEqual(frequencies["weapon"], 2)
+        self.assertNotIn("2022", frequencies)
+        self.assertNotIn("https", frequencies)
+
+    def test_weighted_terms_match_wordcloud_process_text(self):
+        hashtags = {"Ukraine": 3, "ukraine": 2, "StandWithUkraine": 4, "Sanctions": 2, "sanction": 1, "the": 5, "2022": 1}
+        wordcloud = WordCloud(stopwords=STOPWORDS, collocations=False)
+        expected = wordcloud.process_text(" ".join(hashtag for hashtag, count in hashtags.items() for _ in range(count)))
+        frequencies = count_weighted_terms(hashtags, STOPWORDS)
+        self.assertEqual(frequencies, expected)
+        self.assertEqual(frequencies["Ukraine"], 5)
+        self.assertEqual(frequencies["Sanction"], 3)
+        self.assertNotIn("the", frequencies)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import threading
+import unittest
+from src.thread_callback_manager import ThreadCallbackManager
+
+
+class TestThreadCallbackManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = ThreadCallbackManager(workers=1)
+        self.release = threading.Event()
+        self.threads = []
+
+    def callback(self, value):
+        self.threads.append(threading.current_thread().name)
+        self.release.wait(10)
+        return value * 2
+
+    def test_job_runs_on_a_server_thread(self):
+        job_fn = self.manager.make_job_fn(self.callback, progress=False)
+        job = self.manager.call_job_fn("key", job_fn, [21], {})
+        self.assertTrue(self.manager.job_running(job))
+        self.assertIs(self.manager.get_result("key", job), self.manager.UNDEFINED)
+
+        self.release.set()
+        self.manager._jobs[job][1].result(10)
+        # The finished job is still running for Dash until its result is read
+        self.assertTrue(self.manager.job_running(job))
+        self.assertEqual(self.manager.get_result("key", job), 42)
+        self.assertFalse(self.manager.job_running(job))
+        self.assertTrue(self.threads[0].startswith("background-callback"))
+
+    def test_terminate_queued_job(self):
+        job_fn = self.manager.make_job_fn(self.callback, progress=False)
+        running = self.manager.call_job_fn("first", job_fn, [1], {})
+        queued = self.manager.call_job_fn("second", job_fn, [2], {})
+        self.manager.terminate_job(queued)
+        self.assertFalse(self.manager.job_running(queued))
+        self.release.set()
+        self.manager._jobs[running][1].result(10)
+        self.assertEqual(self.manager.get_result("first", running), 2)
+        self.assertFalse(self.manager.result_ready("second"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ from src.view import View
 
 class TestView(unittest.TestCase):
     def setUp(self):
-        self.view = View()
+        self.view = View(warmup=False)
 
     def test_setup_layout(self):
         self.view.setup_layout()
@@ -19,6 +19,13 @@ class TestView(unittest.TestCase):
         # This is a placeholder, replace with actual test
         self.assertIsNotNone(self.view.app.callback_map)
 
+    def test_boot_does_not_load_models(self):
+        view = View(warmup=False, max_models=2, max_bytes=None)
+        stats = view.controller.models.stats()
+        self.assertEqual(stats["misses"], 0)
+        self.assertEqual(stats["resident_dates"], [])
+        self.assertEqual(view.controller.models.max_models, 2)
+
     @patch("src.view.View.run")
     def test_run(self, mock_run):
         self.view.run()
@@ -0,0 +1,92 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import numpy as np
+from src.controller import Controller
+from src.view import View
+
+# Minimum duration of a choropleth update in these tests, in seconds
+SLOW_RENDER = 3
+
+get_choropleth_stances = Controller.get_choropleth_stances
+
+
+def slow_get_choropleth_stances(self, *args, **kwargs):
+    time.sleep(SLOW_RENDER)
+    return get_choropleth_stances(self, *args, **kwargs)
+
+
+def update_request(output: str, inputs: dict) -> dict:
+    """
+    Build the body of a Dash callback request.
+    """
+    component, prop = output.split(".")
+    return {
+        "output": output,
+        "outputs": {"id": component, "property": prop},
+        "inputs": [{"id": id, "property": "value", "value": value} for id, value in inputs.items()],
+        "changedPropIds": [f"{id}.value" for id in inputs],
+        "state": [],
+    }
+
+
+class TestViewConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.view = View(warmup=False)
+        dates = self.view.controller.get_dates()
+        # The bar charts are served from resident models, so their latencies measure queueing only.
+        # The choropleth dates are not resident: their jobs build the models.
+        self.bar_chart_dates, self.choropleth_dates = dates[:2], dates[2:4]
+        self.view.controller.preload_models(self.bar_chart_dates, workers=2)
+        self.client = self.view.app.server.test_client()
+        self.client.get("/")
+
+    def post(self, body: dict, **query) -> tuple:
+        start = time.perf_counter()
+        response = self.client.post("/_dash-update-component", json=body, query_string=query)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json(), time.perf_counter() - start
+
+    def wait_for_job(self, body: dict, job: dict, timeout: float = 120) -> dict:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            result, _ = self.post(body, cacheKey=job["cacheKey"], job=job["job"])
+            if "response" in result:
+                return result["response"]
+        self.fail("The background callback did not finish")
+
+    @patch.object(Controller, "get_choropleth_stances", slow_get_choropleth_stances)
+    def test_slow_views_do_not_block_fast_views(self):
+        models = self.view.controller.models
+        self.assertFalse(any(models.is_loaded(date) for date in self.choropleth_dates))
+        choropleths = [update_request("choropleth-store.data", {"date-dropdown": date}) for date in self.choropleth_dates]
+        bar_charts = [
+            update_request("barchart-div.children", {"date-dropdown": date, "bar-chart-dropdown": option})
+            for date in self.bar_chart_dates
+            for option in ("likes", "retweets")
+        ] * 2
+
+        # Every request comes from the same small pool, as from a server with few request threads
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            jobs = [executor.submit(self.post, body) for body in choropleths]
+            bar_chart_latencies = [latency for _, latency in executor.map(self.post, bar_charts)]
+            jobs = [job.result() for job in jobs]
+
+        # Starting a background callback returns a job handle without building the model or rendering
+        for job, latency in jobs:
+            self.assertIn("job", job)
+            self.assertLess(latency, SLOW_RENDER)
+        # The synchronous views are not queued behind the slow ones
+        self.assertLess(np.percentile(bar_chart_latencies, 95), SLOW_RENDER)
+
+        for body, (job, _) in zip(choropleths, jobs):
+            response = self.wait_for_job(body, job)
+            self.assertEqual(set(response["choropleth-store"]["data"]["stances"]), {"option1", "option2"})
+        # The jobs ran in the server process, so the models they built stay resident
+        self.assertTrue(all(models.is_loaded(date) for date in self.choropleth_dates))
+
+
+if __name__ == "__main__":
+    unittest.main()
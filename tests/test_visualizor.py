@@ -0,0 +1,40 @@
+import unittest
+from plotly.colors import get_colorscale
+from src.controller import Controller
+from src.visualizor import Visualizor
+
+
+class TestVisualizor(unittest.TestCase):
+    def setUp(self):
+        self.controller = Controller()
+        self.stances = self.controller.get_choropleth_stances("02/04")
+
+    def test_choropleth_stances(self):
+        self.assertEqual(
+            self.controller.get_choropleth_data("02/04", "option2"),
+            (self.stances["locations"], self.stances["option2"], self.stances["countries"]),
+        )
+
+    def test_choropleth_store(self):
+        store = Visualizor().create_choropleth_store(self.stances)
+        trace = store["figure"]["data"][0]
+        self.assertEqual(list(trace["locations"]), self.stances["locations"])
+        self.assertEqual(list(trace["z"]), self.stances["option1"])
+        self.assertEqual(store["default"], "option1")
+
+        pro_ukrainian = store["stances"]["option2"]
+        self.assertEqual(pro_ukrainian["z"], self.stances["option2"])
+        self.assertEqual(len(pro_ukrainian["text"]), len(self.stances["locations"]))
+        self.assertEqual(pro_ukrainian["colorscale"], get_colorscale("Blues"))
+        self.assertEqual(pro_ukrainian["colorbar_title"], "Number of pro-ukrainian tweets")
+        self.assertIs(Visualizor().create_choropleth_store(self.stances), store)
+
+    def test_choropleth_map_colors(self):
+        data = (self.stances["locations"], self.stances["option2"], self.stances["countries"])
+        trace = Visualizor().create_choropleth_map(data, "option2").figure["data"][0]
+        self.assertEqual(trace["colorbar"]["title"]["text"], "Number of pro-ukrainian tweets")
+        self.assertEqual([color for _, color in trace["colorscale"]], [color for _, color in get_colorscale("Blues")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from src.controller import Controller
+from src.visualizor import Visualizor
+from src.warmup_scheduler import WarmupScheduler
+
+
+class TestWarmupScheduler(unittest.TestCase):
+    def setUp(self):
+        self.controller = Controller()
+
+    def test_defaults_come_first(self):
+        tasks = WarmupScheduler.plan(["08/04", "02/04"])
+        self.assertEqual(
+            tasks[:3],
+            [("choropleth", "02/04", "option1"), ("wordcloud", "02/04", "wordcloud1"), ("barchart", "02/04", "likes")],
+        )
+        self.assertEqual({date for _, date, _ in tasks[:5]}, {"02/04"})
+        self.assertEqual(len(tasks), 2 * 5)
+
+    def test_warms_every_artifact(self):
+        scheduler = WarmupScheduler(self.controller, workers=2, dates=["02/04"]).start()
+        self.assertTrue(scheduler.wait(timeout=120))
+        progress = scheduler.progress()
+        self.assertEqual(progress["done"], 5)
+        self.assertEqual(progress["fraction"], 1.0)
+        self.assertFalse(progress["running"])
+        self.assertTrue(self.controller.models.is_loaded("02/04"))
+        # The figures the callbacks use are cached
+        hits = Visualizor.figure_cache.hits
+        Visualizor().create_bar_chart(self.controller.get_barchart_data("02/04", "retweets"))
+        Visualizor().create_choropleth_store(self.controller.get_choropleth_stances("02/04"))
+        self.assertEqual(Visualizor.figure_cache.hits, hits + 2)
+
+    def test_dates_fit_in_the_registry(self):
+        controller = Controller(max_models=3)
+        scheduler = WarmupScheduler(controller)
+        self.assertEqual(scheduler.dates, ["02/04", "08/04", "05/05 to 07/05"])
+        self.assertEqual(WarmupScheduler(Controller()).dates, controller.get_dates())
+
+    def test_cancel(self):
+        scheduler = WarmupScheduler(self.controller, dates=self.controller.get_dates())
+        scheduler.cancel()
+        scheduler.start()
+        self.assertTrue(scheduler.wait(timeout=10))
+        progress = scheduler.progress()
+        self.assertEqual(progress["done"], 0)
+        self.assertTrue(progress["cancelled"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from urllib.parse import parse_qs, urlparse
+from src.view import View
+
+
+class TestWordcloudRoute(unittest.TestCase):
+    def setUp(self):
+        self.view = View(warmup=False)
+        self.client = self.view.app.server.test_client()
+        self.url = self.view.controller.wordcloud_url("05/05 to 07/05", "wordcloud1")
+
+    def test_url(self):
+        url = urlparse(self.url)
+        self.assertEqual(url.path, "/wordcloud/wordcloud1.png")
+        query = parse_qs(url.query)
+        self.assertEqual(query["date"], ["05/05 to 07/05"])
+        self.assertEqual(query["v"], [self.view.controller.wordcloud_key("05/05 to 07/05", "wordcloud1")])
+
+    def test_image_and_revalidation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/png")
+        self.assertTrue(response.data.startswith(b"\x89PNG"))
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        etag, weak = response.get_etag()
+        self.assertFalse(weak)
+
+        response = self.client.get(self.url, headers={"If-None-Match": f'"{etag}"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+    def test_revalidation_does_not_load_the_model(self):
+        key = self.view.controller.wordcloud_key("05/05 to 07/05", "wordcloud1")
+        response = self.client.get(self.url, headers={"If-None-Match": f'"{key}"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.view.controller.models.stats()["misses"], 0)
+
+    def test_outdated_version_is_redirected(self):
+        response = self.client.get("/wordcloud/wordcloud2.png?date=02/04&v=outdated")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.headers["Location"], self.view.controller.wordcloud_url("02/04", "wordcloud2"))
+
+    def test_unknown_image(self):
+        self.assertEqual(self.client.get("/wordcloud/wordcloud3.png?date=02/04").status_code, 404)
+        self.assertEqual(self.client.get("/wordcloud/wordcloud1.png?date=01/01").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()